@@ -0,0 +1,64 @@
+from typing import Callable, Dict, Tuple
+
+from arcade.easing import ease_out
+
+# Анимации по времени: скорость движения задается в секундах и не зависит
+# от частоты кадров. Обновляются только объекты, которые сейчас едут.
+
+MOVE_DURATION = 0.35  # Карта переезжает в руке или раздается из колоды
+THROW_DURATION = 0.25  # Карта летит на стол
+
+
+class Tween:
+    """Переезд объекта с атрибутами x/y из текущей точки в end за duration секунд"""
+
+    __slots__ = ("target", "start", "end", "duration", "ease", "elapsed")
+
+    def __init__(self, target, end: Tuple[float, float], duration: float,
+                 ease: Callable[[float], float] = ease_out):
+        self.target = target
+        self.start = (target.x, target.y)
+        self.end = end
+        self.duration = duration
+        self.ease = ease
+        self.elapsed = 0.0
+
+    def update(self, delta_time: float) -> bool:
+        """Сдвинуть объект, True - доехал"""
+        self.elapsed = min(self.elapsed + delta_time, self.duration)
+        progress = self.ease(self.elapsed / self.duration) if self.duration > 0 else 1.0
+        (start_x, start_y), (end_x, end_y) = self.start, self.end
+        self.target.x = start_x + (end_x - start_x) * progress
+        self.target.y = start_y + (end_y - start_y) * progress
+        return self.elapsed >= self.duration
+
+
+class Animator:
+    """Активные анимации, не больше одной на объект. Доехавшие убираются"""
+
+    def __init__(self):
+        self.tweens: Dict[object, Tween] = {}
+
+    @property
+    def active(self) -> bool:
+        return bool(self.tweens)
+
+    def move(self, target, x: float, y: float, duration: float = MOVE_DURATION,
+             ease: Callable[[float], float] = ease_out):
+        """Отправить объект в (x, y). Если он уже едет туда или стоит там - ничего не меняется"""
+        tween = self.tweens.get(target)
+        if tween is not None:
+            if tween.end == (x, y):
+                return
+        elif (target.x, target.y) == (x, y):
+            return
+        # Новая цель - новая анимация от текущей точки, без рывка
+        self.tweens[target] = Tween(target, (x, y), duration, ease)
+
+    def update(self, delta_time: float):
+        finished = [target for target, tween in self.tweens.items() if tween.update(delta_time)]
+        for target in finished:
+            del self.tweens[target]
+
+    def clear(self):
+        self.tweens.clear()
@@ -0,0 +1,315 @@
+import argparse
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from bitboard import NUM_CARDS, NUM_RANKS, SUITS
+from durak_engine import HAND_SIZE
+from move_tables import TABLES
+
+# Пакетный симулятор: тысячи партий на двоих сразу, каждый столбец массивов -
+# отдельная партия. Правила те же, что в DurakEngine (make_move/pass_move/
+# refill_hands/check_game_over), только шаг делается для всех партий разом.
+# Нужен для оценки стратегий бота, в игре не используется.
+#
+# Массивы карт хранятся "по картам": (36, N), чтобы выбор карты сводился к
+# поэлементному min по 36 строкам, а не к медленным редукциям по коротким строкам.
+
+ATTACK, DEFENSE, THROW = 0, 1, 2
+PASS = NUM_CARDS  # Код хода "пас"
+NUM_PLAYERS = 2
+
+CARDS = np.arange(NUM_CARDS, dtype=np.int32)[:, None]
+CARD_SUITS = (np.arange(NUM_CARDS) // NUM_RANKS)[:, None]
+CARD_RANKS = (np.arange(NUM_CARDS, dtype=np.int32) % NUM_RANKS)[:, None]
+# BEATS[защищающаяся, козырь, атакующая] - из тех же таблиц, что у движка
+BEATS = np.stack([
+    np.frombuffer(tables.beat_matrix, dtype=np.uint8).reshape(NUM_CARDS, NUM_CARDS).astype(bool)
+    for tables in TABLES
+]).transpose(2, 0, 1).copy()
+
+# Ключ выбора карты: (оценка << 6 | карта), недопустимые карты сдвигаются за INVALID
+INVALID = 1 << 30
+
+# Поля состояния, у которых последняя ось - партия (сжимаются при отсеве доигранных)
+STATE_FIELDS = ("ids", "deck", "deck_top", "trump", "hands", "hand_sizes", "order", "stamp",
+                "field_mask", "field_pos", "field_len", "last", "phase", "current", "attacker",
+                "winner", "moves")
+
+
+def choose_min(legal: np.ndarray, score: np.ndarray) -> np.ndarray:
+    """Допустимая карта с минимальной оценкой (при равенстве - младший индекс), иначе PASS"""
+    keys = (score << 6 | CARDS) + (~legal) * np.int32(INVALID)
+    best = keys.min(axis=0)
+    return np.where(best < INVALID, best & 63, PASS)
+
+
+class BatchSimulator:
+    """Состояние пачки партий в массивах NumPy.
+
+    hands - (2, 36, N) bool, order - момент попадания карты в руку (порядок
+    карт в списке руки движка), deck - (36, N) индексы карт, берутся с конца
+    до deck_top, field_mask/field_pos - карты стола и их порядок, phase -
+    ATTACK/DEFENSE/THROW. Доигранные партии отсеиваются, результаты
+    копятся в results_winner/results_moves по исходному номеру партии.
+    """
+
+    def __init__(self, decks: np.ndarray, trumps: np.ndarray):
+        n = len(decks)
+        self.n = n
+        self.ids = np.arange(n)
+        self.deck = np.ascontiguousarray(np.asarray(decks, dtype=np.int64).T)
+        self.deck_top = np.full(n, NUM_CARDS, dtype=np.int64)
+        self.trump = np.asarray(trumps, dtype=np.int64)
+        self.hands = np.zeros((NUM_PLAYERS, NUM_CARDS, n), dtype=bool)
+        self.hand_sizes = np.zeros((NUM_PLAYERS, n), dtype=np.int64)
+        self.order = np.zeros((NUM_PLAYERS, NUM_CARDS, n), dtype=np.int32)
+        self.stamp = np.zeros(n, dtype=np.int32)
+        self.field_mask = np.zeros((NUM_CARDS, n), dtype=bool)
+        self.field_pos = np.zeros((NUM_CARDS, n), dtype=np.int32)
+        self.field_len = np.zeros(n, dtype=np.int64)
+        self.last = np.zeros(n, dtype=np.int64)
+        self.phase = np.full(n, ATTACK, dtype=np.int64)
+        self.current = np.zeros(n, dtype=np.int64)
+        self.attacker = np.zeros(n, dtype=np.int64)
+        self.winner = np.full(n, -1, dtype=np.int64)
+        self.moves = np.zeros(n, dtype=np.int64)
+        self.results_winner = np.full(n, -1, dtype=np.int64)
+        self.results_moves = np.zeros(n, dtype=np.int64)
+        self.deal()
+
+    @classmethod
+    def random(cls, n: int, rng: np.random.Generator) -> 'BatchSimulator':
+        decks = rng.permuted(np.tile(np.arange(NUM_CARDS), (n, 1)), axis=1)
+        return cls(decks, rng.integers(0, len(SUITS), n))
+
+    def draw(self, games: np.ndarray, players: np.ndarray):
+        """Каждая партия из games берет верхнюю карту колоды в руку players"""
+        has_cards = self.deck_top[games] > 0
+        games, players = games[has_cards], players[has_cards]
+        self.deck_top[games] -= 1
+        cards = self.deck[self.deck_top[games], games]
+        self.hands[players, cards, games] = True
+        self.hand_sizes[players, games] += 1
+        self.order[players, cards, games] = self.stamp[games]
+        self.stamp[games] += 1
+
+    def deal(self):
+        games = np.arange(self.n)
+        for _ in range(HAND_SIZE):
+            for player in range(NUM_PLAYERS):
+                self.draw(games, np.full(self.n, player))
+        # Ходит игрок с младшим козырем, без козырей - первый
+        is_trump = CARD_SUITS == self.trump
+        lowest_trump = np.where(self.hands & is_trump, CARD_RANKS, NUM_RANKS).min(axis=1)
+        self.attacker = lowest_trump.argmin(axis=0)
+        self.current = self.attacker.copy()
+
+    def current_hand(self) -> np.ndarray:
+        first = self.current == 0
+        return (self.hands[0] & first) | (self.hands[1] & ~first)
+
+    def current_order(self, games: np.ndarray) -> np.ndarray:
+        """(36, k) - порядок карт в руке текущего игрока для партий games"""
+        first = self.current[games] == 0
+        order_0, order_1 = self.order[0][:, games], self.order[1][:, games]
+        return order_1 + (order_0 - order_1) * first
+
+    def legal_moves(self) -> np.ndarray:
+        """(36, N) - карты текущего игрока, которыми можно сходить"""
+        ranks_on_field = np.tile(self.field_mask.reshape(len(SUITS), NUM_RANKS, -1).any(axis=0), (len(SUITS), 1))
+        beats = BEATS[:, self.trump, self.last]
+        first_attack = (self.phase == ATTACK) & (self.field_len == 0)
+        defense = self.phase == DEFENSE
+        odd_field = self.field_len % 2 == 1
+        return self.current_hand() & (first_attack | (ranks_on_field & ~defense) | (beats & (defense & odd_field)))
+
+    def apply(self, actions: np.ndarray, active: np.ndarray):
+        is_pass = actions == PASS
+        self.play(np.flatnonzero(active & ~is_pass), actions[active & ~is_pass])
+        self.pass_turn(np.flatnonzero(active & is_pass & (self.phase != ATTACK)))
+        # Проверка конца партии: побеждает первый игрок без карт
+        empty = self.hand_sizes == 0
+        self.winner = np.where(active, np.where(empty[0], 0, np.where(empty[1], 1, -1)), self.winner)
+
+    def play(self, games: np.ndarray, cards: np.ndarray):
+        players = self.current[games]
+        self.hands[players, cards, games] = False
+        self.hand_sizes[players, games] -= 1
+        self.field_mask[cards, games] = True
+        self.field_pos[cards, games] = self.field_len[games]
+        self.field_len[games] += 1
+        self.last[games] = cards
+        self.moves[games] += 1
+
+        phase = self.phase[games]
+        beaten = self.field_len[games] % 2 == 0
+        defender = (self.attacker[games] + 1) % NUM_PLAYERS
+        self.phase[games] = np.select(
+            [phase == ATTACK, phase == DEFENSE],
+            [DEFENSE, np.where(beaten, THROW, DEFENSE)],
+            DEFENSE)
+        self.current[games] = np.select(
+            [phase == ATTACK, phase == DEFENSE],
+            [(players + 1) % NUM_PLAYERS, np.where(beaten, self.attacker[games], players)],
+            defender)
+
+    def pass_turn(self, games: np.ndarray):
+        if not len(games):
+            return
+        # Защищающийся забирает стол, карты ложатся в руку в порядке стола
+        takers = games[self.phase[games] == DEFENSE]
+        for player in range(NUM_PLAYERS):
+            taking = takers[self.current[takers] == player]
+            taken = self.field_mask[:, taking]
+            self.hands[player][:, taking] |= taken
+            self.order[player][:, taking] = np.where(
+                taken, self.stamp[taking] + self.field_pos[:, taking], self.order[player][:, taking])
+            self.stamp[taking] += self.field_len[taking].astype(np.int32)
+            self.hand_sizes[player, taking] += self.field_len[taking]
+
+        self.field_mask[:, games] = False
+        self.field_len[games] = 0
+        # Добор: сначала атакующий, затем защищающийся
+        for players in (self.attacker[games], (self.attacker[games] + 1) % NUM_PLAYERS):
+            need = HAND_SIZE - self.hand_sizes[players, games]
+            for i in range(int(need.max(initial=0))):
+                short = need > i
+                self.draw(games[short], players[short])
+        self.attacker[games] = (self.attacker[games] + 1) % NUM_PLAYERS
+        self.current[games] = self.attacker[games]
+        self.phase[games] = ATTACK
+        self.moves[games] += 1
+
+    def collect(self, done: np.ndarray):
+        """Сохранить результаты доигранных партий и убрать их из массивов"""
+        self.results_winner[self.ids[done]] = self.winner[done]
+        self.results_moves[self.ids[done]] = self.moves[done]
+        keep = ~done
+        for name in STATE_FIELDS:
+            setattr(self, name, getattr(self, name)[..., keep])
+
+    def run(self, policies, seats: np.ndarray, max_moves: int = 400,
+            rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Доигрывает все партии. seats[i] - индекс стратегии (0/1) за игроком 0 в партии i.
+
+        Возвращает победителей (-1 - ничья по лимиту ходов).
+        """
+        rng = rng or np.random.default_rng()
+        seats = np.asarray(seats)
+        while len(self.ids):
+            active = (self.winner < 0) & (self.moves < max_moves)
+            # Отсеиваем доигранные, когда их набралось много, чтобы не считать впустую
+            if active.sum() * 2 <= len(active):
+                self.collect(~active)
+                continue
+            legal = self.legal_moves()
+            first_policy = (seats[self.ids] ^ self.current) == 0
+            actions = np.full(len(active), PASS)
+            for policy, games in zip(policies, (np.flatnonzero(first_policy), np.flatnonzero(~first_policy))):
+                if len(games):
+                    actions[games] = policy(self, games, legal[:, games], rng)
+            self.apply(actions, active)
+        return self.results_winner
+
+
+# Стратегии: (симулятор, партии, их допустимые карты (36, k), rng) -> карта или PASS для каждой партии
+
+def defense_score(is_trump: np.ndarray) -> np.ndarray:
+    # Младшая карта масти атаки, иначе младший козырь (других допустимых карт при защите нет)
+    return is_trump * np.int32(NUM_RANKS) + CARD_RANKS
+
+
+def by_phase(sim: BatchSimulator, games: np.ndarray, legal: np.ndarray, choosers: Dict[int, Callable]) -> np.ndarray:
+    """Выбор карты отдельно для партий в каждой фазе: choosers[фаза](партии, допустимые карты)"""
+    actions = np.full(len(games), PASS)
+    phase = sim.phase[games]
+    for code, chooser in choosers.items():
+        rows = np.flatnonzero(phase == code)
+        if len(rows):
+            actions[rows] = chooser(games[rows], legal[:, rows])
+    return actions
+
+
+def greedy_policy(sim: BatchSimulator, games: np.ndarray, legal: np.ndarray, rng) -> np.ndarray:
+    """То же, что durak_engine.greedy_move"""
+    def attack(games, legal):
+        return choose_min(legal, sim.current_order(games))  # Первая подходящая карта в руке
+
+    def defend(games, legal):
+        return choose_min(legal, defense_score(CARD_SUITS == sim.trump[games]))
+
+    def throw(games, legal):
+        # Младший ранг среди допустимых, затем первая такая карта в руке
+        ranks = legal.reshape(len(SUITS), NUM_RANKS, -1).any(axis=0)
+        lowest_rank = ranks.argmax(axis=0)
+        return choose_min(legal & (CARD_RANKS == lowest_rank), sim.current_order(games))
+
+    return by_phase(sim, games, legal, {ATTACK: attack, DEFENSE: defend, THROW: throw})
+
+
+def lowest_first_policy(sim: BatchSimulator, games: np.ndarray, legal: np.ndarray, rng) -> np.ndarray:
+    """Как greedy, но атакует младшей некозырной картой и не подкидывает козыри"""
+    is_trump = CARD_SUITS == sim.trump[games]
+    throw = sim.phase[games] == THROW
+    return choose_min(legal & ~(is_trump & throw), defense_score(is_trump))
+
+
+def random_policy(sim: BatchSimulator, games: np.ndarray, legal: np.ndarray, rng) -> np.ndarray:
+    """Случайный допустимый ход, включая пас, где он разрешен"""
+    can_pass = sim.phase[games] != ATTACK
+    allowed = np.concatenate([legal, can_pass[None, :]])
+    # Номер хода среди допустимых, затем строка, где накопленное число допустимых его превышает
+    counts = allowed.cumsum(axis=0, dtype=np.int8)
+    pick = (rng.random(len(games)) * counts[-1]).astype(np.int8)
+    actions = (counts <= pick).sum(axis=0)
+    return np.where(counts[-1] > 0, actions, PASS)
+
+
+POLICIES: Dict[str, Callable] = {
+    "greedy": greedy_policy,
+    "lowest_first": lowest_first_policy,
+    "random": random_policy,
+}
+
+
+def evaluate(policy_a: str, policy_b: str, games: int, max_moves: int = 400,
+             seed: Optional[int] = None) -> Dict:
+    """Матч двух стратегий, места чередуются. Доли побед и скорость в ходах/с"""
+    rng = np.random.default_rng(seed)
+    sim = BatchSimulator.random(games, rng)
+    seats = np.arange(games) % 2  # 0 - стратегия A за игроком 0
+    start = time.perf_counter()
+    winners = sim.run([POLICIES[policy_a], POLICIES[policy_b]], seats, max_moves, rng)
+    elapsed = time.perf_counter() - start
+    winner_policy = np.where(winners < 0, -1, seats ^ winners)
+    moves = int(sim.results_moves.sum())
+    return {
+        "games": games,
+        "wins_a": float(np.mean(winner_policy == 0)),
+        "wins_b": float(np.mean(winner_policy == 1)),
+        "draws": float(np.mean(winner_policy < 0)),
+        "moves": moves,
+        "moves_per_sec": moves / elapsed if elapsed else 0.0,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Пакетная симуляция стратегий бота")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--policy", default="greedy", choices=sorted(POLICIES))
+    parser.add_argument("--opponents", nargs="+", default=["random", "lowest_first"], choices=sorted(POLICIES))
+    parser.add_argument("--max-moves", type=int, default=400,
+                        help="после стольких ходов партия считается ничьей")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    for opponent in args.opponents:
+        result = evaluate(args.policy, opponent, args.games, args.max_moves, args.seed)
+        print(f"{args.policy} vs {opponent}: {result['wins_a']:.1%} / {result['wins_b']:.1%}, "
+              f"ничьи {result['draws']:.1%}, {result['moves']} ходов, "
+              f"{result['moves_per_sec'] / 1e6:.2f} млн ходов/с")
@@ -0,0 +1,58 @@
+from typing import Iterator, List
+
+# Колода из 36 карт как битовая маска в одном int.
+# Индекс карты = индекс масти * 9 + индекс ранга, т.е. каждая масть - 9 бит подряд:
+#   биты 0-8 - ♠ (6..A), 9-17 - ♥, 18-26 - ♦, 27-35 - ♣
+
+SUITS = ["♠", "♥", "♦", "♣"]
+RANKS = ["6", "7", "8", "9", "10", "J", "Q", "K", "A"]
+NUM_RANKS = len(RANKS)
+NUM_CARDS = len(SUITS) * NUM_RANKS
+
+FULL_DECK = (1 << NUM_CARDS) - 1
+RANK_ROW = (1 << NUM_RANKS) - 1  # 9 бит одной масти
+
+CARD_KEYS: List[str] = [f"{rank}_{suit}" for suit in SUITS for rank in RANKS]
+CARD_INDEX = {key: i for i, key in enumerate(CARD_KEYS)}
+CARD_BITS = {key: 1 << i for i, key in enumerate(CARD_KEYS)}
+
+SUIT_MASKS = [RANK_ROW << (s * NUM_RANKS) for s in range(len(SUITS))]
+RANK_MASKS = [sum(1 << (s * NUM_RANKS + r) for s in range(len(SUITS))) for r in range(NUM_RANKS)]
+
+
+def suit_of(index: int) -> int:
+    return index // NUM_RANKS
+
+
+def rank_of(index: int) -> int:
+    return index % NUM_RANKS
+
+
+def mask_of(keys) -> int:
+    mask = 0
+    for key in keys:
+        mask |= CARD_BITS[key]
+    return mask
+
+
+def indices(mask: int) -> Iterator[int]:
+    """Индексы установленных битов по возрастанию"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def keys_of(mask: int) -> List[str]:
+    return [CARD_KEYS[i] for i in indices(mask)]
+
+
+def lowest(mask: int) -> int:
+    """Индекс младшей карты маски (маска не пустая)"""
+    return (mask & -mask).bit_length() - 1
+
+
+def rank_presence(mask: int) -> int:
+    """9-битная маска рангов, встречающихся в mask (в любой масти)"""
+    return (mask | mask >> 9 | mask >> 18 | mask >> 27) & RANK_ROW
+
@@ -0,0 +1,79 @@
+import concurrent.futures
+import multiprocessing
+import time
+from typing import Optional, Tuple
+
+from durak_engine import DurakEngine, greedy_move
+from mcts_bot import BOT_TIME_BUDGETS, choose_move
+
+
+class BotScheduler:
+    """Расчет ходов бота вне главного цикла.
+
+    request() отдает позицию в пул (процессы или потоки), poll() на каждом
+    кадре возвращает готовый ход, но не раньше thinking_delay от запроса.
+    Если партия успела измениться (другой движок или move_number), старый
+    расчет отменяется и результат выбрасывается.
+    """
+
+    def __init__(self, level: str = "normal", thinking_delay: float = 0.6, use_processes: bool = True):
+        self.level = level  # ключ BOT_TIME_BUDGETS
+        self.thinking_delay = thinking_delay
+        self.use_processes = use_processes
+        self.executor = None
+        self.future: Optional[concurrent.futures.Future] = None
+        self.engine: Optional[DurakEngine] = None
+        self.move_number = -1
+        self.requested_at = 0.0
+
+    def get_executor(self) -> concurrent.futures.Executor:
+        if self.executor is None:
+            if self.use_processes:
+                # spawn - дочерний процесс не наследует окно и потоки клиента
+                self.executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        return self.executor
+
+    def is_current(self, engine: DurakEngine) -> bool:
+        return self.future is not None and self.engine is engine and self.move_number == engine.move_number
+
+    def request(self, engine: DurakEngine, player_idx: int):
+        """Начать расчет хода для текущей позиции (прежний расчет отменяется)"""
+        self.cancel()
+        self.engine = engine
+        self.move_number = engine.move_number
+        self.requested_at = time.monotonic()
+        self.future = self.get_executor().submit(
+            choose_move, engine, player_idx, BOT_TIME_BUDGETS[self.level])
+
+    def poll(self, engine: DurakEngine) -> Tuple[bool, Optional[int]]:
+        """(готово, индекс карты в руке или None - пас). Сам запускает расчет при необходимости"""
+        player_idx = engine.current_player_idx
+        if not self.is_current(engine):
+            self.request(engine, player_idx)
+            return False, None
+        if not self.future.done() or time.monotonic() - self.requested_at < self.thinking_delay:
+            return False, None
+
+        future, self.future = self.future, None
+        try:
+            key = future.result()
+            return True, None if key is None else engine.hands[player_idx].index(key)
+        except Exception as e:
+            print(f"Ошибка бота, ход по простой стратегии: {e}")
+            return True, greedy_move(engine, player_idx)
+
+    def cancel(self):
+        # Уже начатый расчет не прервать, но его результат никто не заберет
+        if self.future is not None:
+            self.future.cancel()
+        self.future = None
+        self.engine = None
+
+    def shutdown(self):
+        self.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import PIL.Image
+
+from bitboard import CARD_KEYS
+
+# Атлас колоды: лица карт и рубашка в одной картинке с сеткой одинаковых
+# ячеек. Собирается заранее (python card_atlas.py) или при первом запуске,
+# дальше клиент декодирует один файл вместо 37.
+
+CARD_DIR = "card"
+ATLAS_FILE = "atlas.png"
+LAYOUT_FILE = "atlas.json"
+BACK_KEY = "back"
+CELL_WIDTH = 160  # Вдвое больше карты на столе (CARD_WIDTH x CARD_HEIGHT)
+CELL_HEIGHT = 232
+COLUMNS = 8
+
+Layout = Dict[str, List[int]]  # ключ карты -> [x, y, ширина, высота] в пикселях атласа
+
+
+def source_files(card_dir: str = CARD_DIR) -> Dict[str, str]:
+    """Исходные картинки по ключам. Карты без файла в атлас не попадают"""
+    files = {BACK_KEY: os.path.join(card_dir, "card_back.png")}
+    for key in CARD_KEYS:
+        path = os.path.join(card_dir, f"{key}.png")
+        if os.path.exists(path):
+            files[key] = path
+    return files
+
+
+def build_atlas(card_dir: str = CARD_DIR) -> Tuple[PIL.Image.Image, Layout]:
+    files = source_files(card_dir)
+    rows = (len(files) + COLUMNS - 1) // COLUMNS
+    atlas = PIL.Image.new("RGB", (COLUMNS * CELL_WIDTH, rows * CELL_HEIGHT))
+    layout: Layout = {}
+    for i, (key, path) in enumerate(files.items()):
+        x, y = i % COLUMNS * CELL_WIDTH, i // COLUMNS * CELL_HEIGHT
+        with PIL.Image.open(path) as image:
+            cell = image.convert("RGB").resize((CELL_WIDTH, CELL_HEIGHT), PIL.Image.Resampling.LANCZOS)
+        atlas.paste(cell, (x, y))
+        layout[key] = [x, y, CELL_WIDTH, CELL_HEIGHT]
+    return atlas, layout
+
+
+def save_atlas(atlas: PIL.Image.Image, layout: Layout, card_dir: str = CARD_DIR):
+    atlas.save(os.path.join(card_dir, ATLAS_FILE))
+    with open(os.path.join(card_dir, LAYOUT_FILE), "w", encoding="utf-8") as f:
+        json.dump(layout, f, ensure_ascii=False)
+
+
+def read_cached(card_dir: str = CARD_DIR) -> Optional[Tuple[PIL.Image.Image, Layout]]:
+    """Готовый атлас с диска, None - его нет или исходники новее"""
+    atlas_path = os.path.join(card_dir, ATLAS_FILE)
+    layout_path = os.path.join(card_dir, LAYOUT_FILE)
+    try:
+        built_at = min(os.path.getmtime(atlas_path), os.path.getmtime(layout_path))
+        with open(layout_path, encoding="utf-8") as f:
+            layout = json.load(f)
+    except (OSError, ValueError):
+        return None
+    files = source_files(card_dir)
+    if set(layout) != set(files) or any(os.path.getmtime(path) > built_at for path in files.values()):
+        return None
+    with PIL.Image.open(atlas_path) as image:
+        return image.convert("RGBA"), layout
+
+
+def load_atlas(card_dir: str = CARD_DIR) -> Tuple[PIL.Image.Image, Layout]:
+    """Атлас из кэша, а если его нет - собрать и сохранить"""
+    cached = read_cached(card_dir)
+    if cached is not None:
+        return cached
+    atlas, layout = build_atlas(card_dir)
+    try:
+        save_atlas(atlas, layout, card_dir)
+    except OSError as e:
+        print(f"Не удалось сохранить атлас карт: {e}")
+    return atlas, layout
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сборка атласа карт")
+    parser.add_argument("--card-dir", default=CARD_DIR)
+    args = parser.parse_args()
+    atlas, layout = build_atlas(args.card_dir)
+    save_atlas(atlas, layout, args.card_dir)
+    print(f"Атлас {atlas.size[0]}x{atlas.size[1]}, карт: {len(layout)}")
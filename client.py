@@ -5,10 +5,21 @@ import time
 from typing import List, Optional, Dict
 import socket
 import threading
-import json
 import os
 import pyglet
 import uuid
+import PIL.Image
+import PIL.ImageDraw
+
+from animation import MOVE_DURATION, THROW_DURATION, Animator
+from bitboard import CARD_BITS, CARD_INDEX, CARD_KEYS, mask_of
+from bot_scheduler import BotScheduler
+from card_atlas import BACK_KEY, load_atlas
+from durak_engine import STATE_SCALARS, SUITS, DurakEngine
+from inbox import Inbox
+from move_tables import tables_for
+from protocol import FORMAT_BINARY, FORMATS, MessageDecoder, ProtocolError, decode_message, encode_message
+from text_layer import TextLayer
 
 # Настройки игры
 SCREEN_WIDTH = 1000
@@ -18,15 +29,14 @@ CARD_HEIGHT = 116
 BUTTON_WIDTH = 200
 BUTTON_HEIGHT = 50
 MAX_PLAYERS_PER_LOBBY = 2
-
-SUITS = ["♠", "♥", "♦", "♣"]
-RANKS = ["6", "7", "8", "9", "10", "J", "Q", "K", "A"]
-RANK_VALUES = {rank: i for i, rank in enumerate(RANKS)}
+LOBBY_PAGE_SIZE = 500  # Лобби в одном ответе list_lobbies (MAX_LOBBY_PAGE_SIZE сервера)
+GAME_FRAME_INTERVAL = 1 / 60
+MENU_FRAME_INTERVAL = 1 / 30  # В меню и лобби кадры реже
+MENU_UPDATE_RATE = 1 / 20  # В меню on_update только разбирает сеть
 
 # Настройки сети
 SERVER_HOST = "127.0.0.1"
 SERVER_PORT = 5555
-BUFFER_SIZE = 4096
 # Добавляем в начало файла, после импортов
 LOCALIZATION = {
     "en": {
@@ -217,17 +227,61 @@ class BackgroundManager:
         """Отрисовка фона для игры"""
         self.draw()  # Или добавьте специальную логику для игры
 
+class RenderScheduler:
+    """Решает, рисовать ли кадр. Кадр нужен, если что-то поменялось: ввод
+    (invalidate), снимок состояния экрана (watch), движущиеся карты.
+    Иначе кадр пропускается целиком - и on_draw, и flip, на экране остается
+    прошлый. После кадра с изменениями рисуется еще один (второй буфер
+    swap-цепочки тоже должен получить новое изображение), а раз в
+    idle_interval кадр рисуется все равно, на всякий случай.
+    """
+
+    def __init__(self, idle_interval: float = 0.5):
+        self.idle_interval = idle_interval
+        self.dirty = True
+        self.animating = False
+        self.signature = None
+        self.last_draw = 0.0
+        self.skipped = False  # Текущий кадр пропущен, flip не нужен
+        self.follow_up = False  # Прошлый кадр был с изменениями - следующий тоже рисуем
+
+    def invalidate(self):
+        self.dirty = True
+
+    def watch(self, signature: tuple):
+        """Снимок всего, что видно на экране; изменился - нужен кадр"""
+        if signature != self.signature:
+            self.signature = signature
+            self.dirty = True
+
+    def begin_frame(self, min_interval: float) -> bool:
+        """True - кадр рисуем. min_interval ограничивает частоту кадров"""
+        elapsed = time.monotonic() - self.last_draw
+        self.skipped = elapsed < min_interval or not (
+            self.dirty or self.follow_up or self.animating or elapsed >= self.idle_interval)
+        if not self.skipped:
+            self.follow_up, self.dirty = self.dirty, False
+            self.last_draw = time.monotonic()
+        return not self.skipped
+
+
 class NetworkManager:
     def __init__(self):
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.connected = False
-        self.message_queue = []
+        self.inbox = Inbox()
+        self.decoder = MessageDecoder()
+        self.binary = False  # Двоичный формат - после ответа сервера на hello
+        self.negotiating = False
         
     def connect(self, host, port):
         try:
             self.socket.connect((host, port))
             self.connected = True
+            # Первый ответ сервера - на hello, его разбирает поток приема
+            self.negotiating = True
             threading.Thread(target=self.receive_messages, daemon=True).start()
+            self.send_message({"action": "hello", "formats": list(FORMATS)})
             return True
         except Exception as e:
             print(f"Connection error: {e}")
@@ -236,11 +290,26 @@ class NetworkManager:
     def receive_messages(self):
         while self.connected:
             try:
-                data = self.socket.recv(BUFFER_SIZE)
-                if data:
-                    message = json.loads(data.decode())
-                    self.message_queue.append(message)
-            except Exception as e:
+                frames = self.decoder.recv_from(self.socket)
+                if frames is None:
+                    print("Сервер закрыл соединение")
+                    self.connected = False
+                    break
+                # Разбираем все целые сообщения, пришедшие за одно чтение
+                for frame in frames:
+                    try:
+                        message = decode_message(frame)
+                    except ValueError as e:
+                        print(f"Receive error: {e}")
+                        continue
+                    if self.negotiating:
+                        self.negotiating = False
+                        # Старый сервер hello не знает и отвечает ошибкой - остаемся на JSON
+                        self.binary = message.get("format") == FORMAT_BINARY
+                        if message.get("action") == "hello" or message.get("status") == "error":
+                            continue
+                    self.inbox.put(message)
+            except (ProtocolError, OSError) as e:
                 print(f"Receive error: {e}")
                 self.connected = False
     
@@ -251,74 +320,152 @@ class NetworkManager:
             
         try:
             print("Отправка сообщения:", message)  # Логирование
-            self.socket.sendall(json.dumps(message).encode())
+            self.socket.sendall(encode_message(message, self.binary))
             return True
         except Exception as e:
             print(f"Ошибка отправки: {e}")
             self.connected = False
             return False
 
-class Card:
-    def __init__(self, suit: str, rank: str):
-        self.suit = suit
-        self.rank = rank
-        self.key = f"{rank}_{suit}"
-        self.face_up = False
-        self.texture = None
-        try:
-            print(f"Пытаюсь загрузить текстуру для карты: card/{self.key}.png")  # Отладочное сообщение
-            self.texture = arcade.load_texture(f"card/{self.key}.png")
-            print("Текстура успешно загружена")  # Отладочное сообщение
-        except Exception as e:
-            print(f"Ошибка загрузки текстуры карты: {e}")  # Отладочное сообщение
-            self.texture = arcade.load_texture("card/card_back.png")
-        self.x = 0
-        self.y = 0
-        self.target_x = 0
-        self.target_y = 0
-        self.angle = 0
-        self.face_up = False
-        self.selected = False
-        self.animation_progress = 0
-        self.animation_type = None  # 'throw', 'deal', None
-        self.animation_start = (0, 0)
-        self.animation_time = 0
-
-    def start_animation(self, anim_type, start_pos):
-        self.animation_type = anim_type
-        self.animation_start = start_pos
-        self.animation_time = 0
-
-    def update(self):
-        self.animation_time += 0.05
-        
-        if self.animation_type == 'throw':
-            progress = min(1, self.animation_time * 2)
-            if progress < 1:
-                # Прямое движение в центр стола
-                center_x = SCREEN_WIDTH // 2
-                center_y = SCREEN_HEIGHT // 2
-                self.x = self.animation_start[0] + (center_x - self.animation_start[0]) * progress
-                self.y = self.animation_start[1] + (center_y - self.animation_start[1]) * progress
-        else:
-            # Обычное плавное перемещение
-            if self.animation_progress < 1:
-                self.animation_progress += 0.05
-                self.x = self.x + (self.target_x - self.x) * 0.1
-                self.y = self.y + (self.target_y - self.y) * 0.1
-                if abs(self.target_x - self.x) < 1 and abs(self.target_y - self.y) < 1:
-                    self.animation_progress = 1
-                    self.x = self.target_x
-                    self.y = self.target_y
-                
-    def draw(self):
-        if self.texture:
-            arcade.draw_texture_rectangle(self.x, self.y, CARD_WIDTH, CARD_HEIGHT, 
-                                      self.texture if self.face_up else arcade.load_texture("card/card_back.png"), 
-                                      self.angle)
-        if self.selected:
-            arcade.draw_rectangle_outline(self.x, self.y, CARD_WIDTH+10, CARD_HEIGHT+10, 
-                                       arcade.color.GOLD, 2)
+class CardTextures:
+    """Текстуры карт на весь процесс: 36 лиц и рубашка грузятся один раз
+    из атласа (card_atlas.py), дальше Card и стол берут готовые объекты
+    по ключу карты.
+    """
+
+    def __init__(self):
+        self.back: Optional[arcade.Texture] = None
+        self.faces: Dict[str, arcade.Texture] = {}
+
+    def load(self):
+        if self.back is not None:
+            return
+        atlas, layout = load_atlas()  # Один файл - одно декодирование
+        for key, (x, y, width, height) in layout.items():
+            texture = arcade.Texture(f"card_atlas/{key}", atlas.crop((x, y, x + width, y + height)),
+                                     hit_box_algorithm="None")
+            if key == BACK_KEY:
+                self.back = texture
+            else:
+                self.faces[key] = texture
+        missing = [key for key in CARD_KEYS if key not in self.faces]
+        if missing:
+            # Без картинки карта показывается рубашкой
+            print(f"Нет картинок карт: {', '.join(missing)}")
+        for key in missing:
+            self.faces[key] = self.back
+
+    def face(self, key: Optional[str]) -> arcade.Texture:
+        """Лицо карты, для None (скрытая карта) - рубашка"""
+        self.load()
+        return self.back if key is None else self.faces[key]
+
+    def card_back(self) -> arcade.Texture:
+        self.load()
+        return self.back
+
+
+CARD_TEXTURES = CardTextures()
+
+
+# Рамки подсветки карт: (цвет, отступ от края карты)
+SELECTED_OUTLINE = (arcade.color.GOLD, 10)
+PLAYABLE_OUTLINE = (arcade.color.LIGHT_GREEN, 6)
+_outline_textures: Dict[tuple, arcade.Texture] = {}
+
+
+def outline_texture(color, margin: int) -> arcade.Texture:
+    """Прозрачная текстура с рамкой вокруг карты, одна на цвет"""
+    key = (tuple(color), margin)
+    if key not in _outline_textures:
+        image = PIL.Image.new("RGBA", (CARD_WIDTH + margin, CARD_HEIGHT + margin), (0, 0, 0, 0))
+        PIL.ImageDraw.Draw(image).rectangle(
+            (0, 0, image.width - 1, image.height - 1), outline=tuple(color), width=2)
+        _outline_textures[key] = arcade.Texture(f"outline_{key}", image, hit_box_algorithm="None")
+    return _outline_textures[key]
+
+
+class Card(arcade.Sprite):
+    """Спрайт карты на столе. Сама карта - только ключ вида "10_♠" (durak_engine),
+    здесь хранятся положение, анимация и текстура.
+
+    Рисуется не сама по себе, а в составе SpriteList стола (GameTable):
+    сеттеры Sprite обновляют вершины списка, только когда что-то поменялось.
+    Двигает карты Animator в GameUI.
+    """
+
+    def __init__(self, key: Optional[str]):
+        super().__init__()
+        self.key = key  # None - скрытая карта соперника, видна только рубашка
+        self.face_texture = CARD_TEXTURES.face(key)
+        self.back_texture = CARD_TEXTURES.card_back()
+        self.outline = arcade.Sprite()  # Рамка выделения, лежит в GameTable.outline_sprites
+        self.outline.visible = False
+        self._face_up = False
+        self._selected = False
+        self._playable = False  # Подсветка карт, которыми можно сходить
+        self.set_card_texture(self.back_texture)
+
+    def set_card_texture(self, texture: arcade.Texture):
+        self.texture = texture
+        # Размер карты на столе не зависит от размера картинки
+        self.width = CARD_WIDTH
+        self.height = CARD_HEIGHT
+
+    @property
+    def x(self) -> float:
+        return self.center_x
+
+    @x.setter
+    def x(self, value: float):
+        self.center_x = value
+        self.outline.center_x = value
+
+    @property
+    def y(self) -> float:
+        return self.center_y
+
+    @y.setter
+    def y(self, value: float):
+        self.center_y = value
+        self.outline.center_y = value
+
+    @property
+    def face_up(self) -> bool:
+        return self._face_up
+
+    @face_up.setter
+    def face_up(self, value: bool):
+        if value != self._face_up:
+            self._face_up = value
+            self.set_card_texture(self.face_texture if value else self.back_texture)
+
+    @property
+    def selected(self) -> bool:
+        return self._selected
+
+    @selected.setter
+    def selected(self, value: bool):
+        if value != self._selected:
+            self._selected = value
+            self.update_outline()
+
+    @property
+    def playable(self) -> bool:
+        return self._playable
+
+    @playable.setter
+    def playable(self, value: bool):
+        if value != self._playable:
+            self._playable = value
+            self.update_outline()
+
+    def update_outline(self):
+        if self._selected:
+            self.outline.texture = outline_texture(*SELECTED_OUTLINE)
+        elif self._playable:
+            self.outline.texture = outline_texture(*PLAYABLE_OUTLINE)
+        self.outline.visible = self._selected or self._playable
 
 class Player:
     def __init__(self, idx: int, name: str, is_human: bool = False):
@@ -326,206 +473,186 @@ class Player:
         self.name = name
         self.is_human = is_human
         self.hand: List[Card] = []
-        self.is_attacking = False
-        self.is_defending = False
-        
-    def add_card(self, card: Card):
-        self.hand.append(card)
-        # Свои карты всегда видны
-        card.face_up = self.is_human
-        
-    def play_card(self, card_idx: int) -> Optional[Card]:
-        if 0 <= card_idx < len(self.hand):
-            card = self.hand.pop(card_idx)
-            return card
-        return None
 
-class GameState:
-    def __init__(self):
-        self.players: List[Player] = []
-        self.deck: List[Card] = []
+class GameTable:
+    """Стол на экране: спрайты карт поверх состояния партии.
+
+    Правила исполняет DurakEngine: в одиночной игре - локальный (engine),
+    в сетевой - на сервере, который присылает снимок состояния (apply_state())
+    и дальше только изменения (apply_delta()).
+    """
+
+    def __init__(self, players_info: List[Dict], your_index: int, engine: Optional[DurakEngine] = None):
+        self.engine = engine
+        self.online = engine is None
+        self.your_index = your_index
+        self.players = [Player(i, info["name"], i == your_index) for i, info in enumerate(players_info)]
         self.field: List[Card] = []
         self.trump_suit: Optional[str] = None
+        self.deck_size = 0
         self.current_player_idx = 0
         self.game_phase = "attack"  # "attack", "defense", "throw"
         self.attacker_idx = 0  # Индекс основного атакующего игрока
         self.winner = None
         self.last_move_time = time.time()
         self.move_timeout = 15  # секунд на ход
-        
-    def init_game(self, players_info: List[Dict], trump_suit: str, your_index: int):
-        self.players = [Player(i, info["name"], info.get("is_you", False)) for i, info in enumerate(players_info)]
-        self.trump_suit = trump_suit
-        
-        # Создаем колоду и перемешиваем
-        self.deck = [Card(suit, rank) for suit in SUITS for rank in RANKS]
-        random.shuffle(self.deck)
-        
-        # Раздача карт с правильным позиционированием
-        for _ in range(6):
-            for i, player in enumerate(self.players):
-                if self.deck:
-                    card = self.deck.pop()
-                    player.add_card(card)
-                    # Устанавливаем начальную позицию карты (центр экрана)
-                    card.x = SCREEN_WIDTH // 2
-                    card.y = SCREEN_HEIGHT // 2
-                    # Целевая позиция будет установлена в position_cards
-                    card.target_x = 0
-                    card.target_y = 0
-        
-    def determine_first_player(self):
-        min_trump = None
-        for i, player in enumerate(self.players):
+        self.player_positions = []  # откуда вылетают карты соперников, задает GameUI
+        self.version = 0  # Растет с каждым обновлением стола, по нему GameUI понимает, что стол поменялся
+        self.seq: Optional[int] = None  # Номер последнего сообщения сервера о столе
+        self.resyncing = False  # Пропущено изменение, ждем снимок
+        # Списки спрайтов: каждый рисуется одним вызовом, состав меняется только при обновлении стола
+        self.hand_sprites = [arcade.SpriteList() for _ in self.players]
+        self.field_sprites = arcade.SpriteList()
+        self.outline_sprites = arcade.SpriteList()
+        self.deck_sprites = arcade.SpriteList()
+        deck_card = Card(None)
+        deck_card.x, deck_card.y = SCREEN_WIDTH * 0.1, SCREEN_HEIGHT // 2
+        self.deck_sprites.append(deck_card)
+        
+    @classmethod
+    def local(cls, players_info: List[Dict], your_index: int, trump_suit: Optional[str] = None) -> 'GameTable':
+        """Одиночная игра: локальный движок, одна тасовка"""
+        engine = DurakEngine([info["name"] for info in players_info], trump_suit)
+        engine.deal()
+        table = cls(players_info, your_index, engine)
+        table.apply_state(engine.state_for(your_index))
+        return table
+        
+    def apply_state(self, state: Dict):
+        """Применение состояния стола (от движка или сервера).
+
+        Объекты Card переиспользуются по ключу, чтобы карты продолжали
+        анимацию со своих мест, а не появлялись заново.
+        """
+        known = {card.key: card for card in self.field}
+        for player in self.players:
             for card in player.hand:
-                if card.suit == self.trump_suit:
-                    if min_trump is None or RANK_VALUES[card.rank] < RANK_VALUES[min_trump.rank]:
-                        min_trump = card
-                        self.current_player_idx = i
-                        
-    def can_beat(self, attacking_card: Card, defending_card: Card) -> bool:
-        if defending_card.suit == self.trump_suit and attacking_card.suit != self.trump_suit:
-            return True
-        if defending_card.suit == attacking_card.suit:
-            return RANK_VALUES[defending_card.rank] > RANK_VALUES[attacking_card.rank]
-        return False
-    
-    def is_valid_defense(self, card: Card) -> bool:
-        """Проверка валидности карты для защиты"""
-        if not self.field or len(self.field) % 2 != 1:
-            return False  # Нет карты для отбития или нечетное количество карт
-        
-        last_attack = self.field[-1]
-        return self.can_beat(last_attack, card)
-    
-    def is_valid_throw(self, card: Card) -> bool:
-        """Проверка валидности карты для подкидывания"""
-        if not self.field:
-            return False
-        return any(card.rank == f.rank for f in self.field)
-    
-    def is_valid_attack(self, card: Card) -> bool:
-        """Проверка валидности карты для атаки"""
-        if not self.field:
-            return True  # Первая карта в атаке - любая
-        return any(card.rank == f.rank for f in self.field)
-        
-    def is_valid_move(self, card: Card, player_idx: int) -> bool:
-        if self.game_phase == "attack":
-            if not self.field:
-                return True
-            return any(card.rank == f.rank for f in self.field)
-        elif self.game_phase == "defense":
-            if len(self.field) % 2 == 1:
-                attacking_card = self.field[-1]
-                return self.can_beat(attacking_card, card)
-        return False
+                if card.key:
+                    known[card.key] = card
+                    
+        mover_idx = (state.get("last_move") or {}).get("player_idx", self.current_player_idx)
+        self.players[self.your_index].hand = [self.take_card(known, key) for key in state["hand"]]
+        self.resize_hidden_hands(state["hand_sizes"])
+        self.field = [self.take_card(known, key, mover_idx) for key in state["field"]]
+        self.trump_suit = state["trump_suit"]
+        self.deck_size = state["deck_size"]
+        self.game_phase = state["game_phase"]
+        self.current_player_idx = state["current_player_idx"]
+        self.attacker_idx = state["attacker_idx"]
+        self.winner = state["winner"]
+        self.finish_update()
+
+    def apply_delta(self, delta: Dict):
+        """Изменения стола от сервера (durak_engine.state_delta): переезжают только
+        карты, которых они касаются, остальные объекты Card не трогаются."""
+        mover_idx = (delta.get("last_move") or {}).get("player_idx", self.current_player_idx)
+        me = self.players[self.your_index]
+        loose: Dict[str, Card] = {}  # Карты, ушедшие со своего места: сыгранные и снятые со стола
+        if "hand" in delta:
+            loose.update((card.key, card) for card in me.hand)
+            me.hand, hand_add = [], delta["hand"]
+        else:
+            removed = set(delta.get("hand_remove", ()))
+            if removed:
+                loose.update((card.key, card) for card in me.hand if card.key in removed)
+                me.hand = [card for card in me.hand if card.key not in removed]
+            hand_add = delta.get("hand_add", ())
+        if "field" in delta:
+            loose.update((card.key, card) for card in self.field)
+            self.field, field_add = [], delta["field"]
+        else:
+            field_add = delta.get("field_add", ())
+        self.field.extend(self.take_card(loose, key, mover_idx) for key in field_add)
+        me.hand.extend(self.take_card(loose, key) for key in hand_add)
+        if "hand_sizes" in delta:
+            self.resize_hidden_hands(delta["hand_sizes"])
+        for name in STATE_SCALARS:
+            if name in delta:
+                setattr(self, name, delta[name])
+        self.finish_update()
+
+    def take_card(self, known: Dict[str, Card], key: str, mover_idx: Optional[int] = None) -> Card:
+        """Карта с известным ключом: уже лежащая на экране или новая.
+
+        Новая карта на столе (mover_idx задан) прилетает от руки соперника, в руке - из колоды.
+        """
+        card = known.pop(key, None)
+        if card is None:
+            card = Card(key)
+            if mover_idx is not None and self.player_positions:
+                card.x, card.y, _ = self.player_positions[mover_idx]
+            else:
+                card.x, card.y = SCREEN_WIDTH * 0.1, SCREEN_HEIGHT // 2
+        card.face_up = True
+        return card
+
+    def resize_hidden_hands(self, hand_sizes: List[int]):
+        # Руки соперников известны только по размеру
+        for i, player in enumerate(self.players):
+            if i == self.your_index:
+                continue
+            hidden = player.hand
+            while len(hidden) < hand_sizes[i]:
+                card = Card(None)
+                card.x, card.y = SCREEN_WIDTH * 0.1, SCREEN_HEIGHT // 2
+                hidden.append(card)
+            del hidden[hand_sizes[i]:]
+
+    def finish_update(self):
+        self.last_move_time = time.time()
+        self.update_playable()
+        self.rebuild_sprite_lists()
+        self.version += 1
+
+    def rebuild_sprite_lists(self):
+        for player, sprites in zip(self.players, self.hand_sprites):
+            sprites.clear()
+            sprites.extend(player.hand)
+        self.field_sprites.clear()
+        self.field_sprites.extend(self.field)
+        self.outline_sprites.clear()
+        self.outline_sprites.extend(card.outline for card in self.players[self.your_index].hand)
+        
+    def update_playable(self):
+        """Отметка карт своей руки, которыми можно сходить (по таблицам ходов)"""
+        hand = self.players[self.your_index].hand
+        legal = 0
+        if self.current_player_idx == self.your_index and self.winner is None:
+            field = self.field
+            last_card = CARD_INDEX[field[-1].key] if len(field) % 2 == 1 else None
+            legal = tables_for(self.trump_suit).legal_moves(
+                self.game_phase, mask_of(card.key for card in hand), mask_of(card.key for card in field), last_card)
+        for card in hand:
+            card.playable = bool(legal & CARD_BITS[card.key])
+        
+    def sync(self, last_move: Optional[Dict] = None):
+        state = self.engine.state_for(self.your_index)
+        state["last_move"] = last_move
+        self.apply_state(state)
+        
+    def cards_left(self) -> int:
+        return self.deck_size
+        
+    def is_valid_move(self, card: Card) -> bool:
+        # В сетевой игре ход все равно проверит сервер
+        return card.playable
         
     def make_move(self, player_idx: int, card_idx: int) -> bool:
-        if player_idx != self.current_player_idx:
+        if self.online or not self.engine.make_move(player_idx, card_idx):
             return False
-            
-        player = self.players[player_idx]
-        if card_idx < 0 or card_idx >= len(player.hand):
-            return False
-            
-        card = player.hand[card_idx]
-        
-        # Проверка валидности хода в зависимости от фазы
-        if self.game_phase == "attack" and not self.is_valid_attack(card):
-            return False
-        elif self.game_phase == "defense" and not self.is_valid_defense(card):
-            return False
-        elif self.game_phase == "throw" and not self.is_valid_throw(card):
-            return False
-            
-        played_card = player.play_card(card_idx)
-        if played_card:
-            self.field.append(played_card)
-            self.last_move_time = time.time()
-            played_card.face_up = True
-            
-            # Логика перехода между фазами
-            if self.game_phase == "attack":
-                self.game_phase = "defense"
-                self.current_player_idx = (player_idx + 1) % len(self.players)
-                
-            elif self.game_phase == "defense":
-                if len(self.field) % 2 == 0:  # Четное количество карт = все отбито
-                    self.game_phase = "throw"
-                    self.current_player_idx = self.attacker_idx
-                else:
-                    self.current_player_idx = player_idx  # Остаемся у того же игрока
-                    
-            elif self.game_phase == "throw":
-                self.game_phase = "defense"
-                self.current_player_idx = (self.attacker_idx + 1) % len(self.players)
-                
-            return True
-        return False
+        self.sync({"player_idx": player_idx, "type": "play"})
+        return True
         
     def pass_move(self, player_idx: int) -> bool:
-        if player_idx != self.current_player_idx:
+        if self.online or not self.engine.pass_move(player_idx):
             return False
-            
-        if self.game_phase == "defense":
-            # Забрать карты должен защищающийся игрок (тот, кто пасует)
-            taking_player = self.players[player_idx]
-            taking_player.hand.extend(self.field)
-            for card in self.field:
-                card.face_up = False  # Скрываем карты, которые забирает игрок
-            self.field.clear()
-            self.refill_hands()
-            
-            # Переход хода
-            self.attacker_idx = (self.attacker_idx + 1) % len(self.players)
-            self.current_player_idx = self.attacker_idx
-            self.game_phase = "attack"
-            return True
-            
-        elif self.game_phase == "throw":
-            # Завершение кона
-            self.field.clear()
-            self.refill_hands()
-            
-            # Переход хода следующему игроку
-            self.attacker_idx = (self.attacker_idx + 1) % len(self.players)
-            self.current_player_idx = self.attacker_idx
-            self.game_phase = "attack"
-            return True
-            
-        return False
-
+        self.sync({"player_idx": player_idx, "type": "pass"})
+        return True
         
-    def refill_hands(self):
-        # Сначала добирает атакующий, затем защищающийся
-        players_order = [
-            self.attacker_idx,
-            (self.attacker_idx + 1) % len(self.players)
-        ]
-        
-        for player_idx in players_order:
-            player = self.players[player_idx]
-            while len(player.hand) < 6 and self.deck:
-                card = self.deck.pop()
-                player.add_card(card)
-                # Устанавливаем начальную позицию карты (из колоды)
-                card.x = SCREEN_WIDTH * 0.1  # Позиция колоды
-                card.y = SCREEN_HEIGHT // 2
-                # Целевая позиция будет установлена в position_cards
-                card.target_x = 0
-                card.target_y = 0
-                # Карты бота должны быть рубашкой вверх
-                if not player.is_human:
-                    card.face_up = False
-
-                
     def check_game_over(self):
-        for i, player in enumerate(self.players):
-            if not player.hand:
-                self.winner = i
-                return True
-        return False
+        if not self.online and self.winner is None and self.engine.check_game_over():
+            self.winner = self.engine.winner
+        return self.winner is not None
 
 class Button:
     def __init__(self, x, y, width, height, text, action=None, parent=None):
@@ -560,9 +687,10 @@ class Button:
             arcade.draw_rectangle_filled(self.x, self.y, self.width, self.height, color)
         
         text_color = arcade.color.GOLD if self.hovered else arcade.color.WHITE
-        arcade.draw_text(self.text, self.x, self.y, text_color, 20,
-                        anchor_x="center", anchor_y="center", 
-                        font_name=self.parent.minecraft_font_name if self.parent else None)
+        draw_text = self.parent.text_layer.draw if self.parent else arcade.draw_text
+        draw_text(self.text, self.x, self.y, text_color, 20,
+                  anchor_x="center", anchor_y="center",
+                  font_name=self.parent.minecraft_font_name if self.parent else None)
         
     def check_hover(self, x, y):
         if not self.active:
@@ -578,6 +706,123 @@ class Button:
     def check_click(self, x, y):
         return (self.hovered and self.action)
 
+class LobbyRow:
+    """Строка списка лобби: текст собирается один раз, когда лобби приходит с сервера,
+    кнопка - когда строка впервые попадает на экран"""
+
+    def __init__(self, lobby: Dict, on_join, parent=None):
+        self.lobby = lobby
+        self.on_join = on_join
+        self.parent = parent
+        self.search_name = lobby["name"].casefold()
+        self.joinable = not lobby["game_started"] and lobby["player_count"] < lobby["max_players"]
+        lock = " [locked]" if lobby.get("has_password") else ""
+        self.text = f"{lobby['name']} ({lobby['player_count']}/{lobby['max_players']}){lock}"
+        self._button = None
+
+    @property
+    def button(self) -> Optional[Button]:
+        """Кнопка входа, None - игра уже идет"""
+        if self._button is None and not self.lobby["game_started"]:
+            lobby_id = self.lobby["id"]
+            self._button = Button(0, 0, 100, 30, "Join", lambda: self.on_join(lobby_id), self.parent)
+        return self._button
+
+
+class LobbyBrowser:
+    """Список лобби с поиском, фильтрами и прокруткой.
+
+    Строки живут в rows по id и пересобираются только для изменившихся
+    лобби. filtered - строки, прошедшие фильтры, пересчитывается при смене
+    данных или фильтра. Рисуются только строки текущего окна прокрутки
+    (shown), поэтому тысячи лобби не замедляют кадр.
+    """
+
+    ROW_HEIGHT = 50
+    SCROLL_ROWS = 3  # Строк на один щелчок колеса
+    PASSWORD_FILTERS = ("all", "open", "locked")
+
+    def __init__(self, on_join, parent=None):
+        self.on_join = on_join
+        self.parent = parent
+        self.rows: Dict[str, LobbyRow] = {}
+        self.filtered: List[LobbyRow] = []
+        self.search_text = ""  # Как набрал игрок, query - для сравнения
+        self.query = ""
+        self.joinable_only = False
+        self.password_filter = "all"
+        self.first_row = 0
+        self.page_size = 1
+
+    def set_lobbies(self, lobbies: List[Dict]):
+        """Полный снимок списка"""
+        self.rows = {lobby["id"]: LobbyRow(lobby, self.on_join, self.parent) for lobby in lobbies}
+        self.refilter()
+
+    def update_lobbies(self, removed: List[str], changed: List[Dict]):
+        """Изменения списка: пересобираются только затронутые строки"""
+        for lobby_id in removed:
+            self.rows.pop(lobby_id, None)
+        for lobby in changed:
+            self.rows[lobby["id"]] = LobbyRow(lobby, self.on_join, self.parent)
+        self.refilter()
+
+    def matches(self, row: LobbyRow) -> bool:
+        if self.query and self.query not in row.search_name:
+            return False
+        if self.joinable_only and not row.joinable:
+            return False
+        has_password = bool(row.lobby.get("has_password"))
+        if self.password_filter == "open" and has_password or self.password_filter == "locked" and not has_password:
+            return False
+        return True
+
+    def refilter(self):
+        self.filtered = [row for row in self.rows.values() if self.matches(row)]
+        self.scroll_to(self.first_row)
+
+    def set_query(self, text: str):
+        self.search_text = text
+        query = text.strip().casefold()
+        if query != self.query:
+            self.query = query
+            self.first_row = 0
+            self.refilter()
+
+    def toggle_joinable(self):
+        self.joinable_only = not self.joinable_only
+        self.first_row = 0
+        self.refilter()
+
+    def cycle_password_filter(self):
+        i = self.PASSWORD_FILTERS.index(self.password_filter)
+        self.password_filter = self.PASSWORD_FILTERS[(i + 1) % len(self.PASSWORD_FILTERS)]
+        self.first_row = 0
+        self.refilter()
+
+    def layout(self, top: float, bottom: float):
+        """Область списка на экране, от нее зависит размер страницы"""
+        self.page_size = max(1, int((top - bottom) // self.ROW_HEIGHT))
+        self.scroll_to(self.first_row)
+
+    def scroll_to(self, first_row: int):
+        self.first_row = max(0, min(first_row, len(self.filtered) - self.page_size))
+
+    def scroll(self, rows: int):
+        self.scroll_to(self.first_row + rows)
+
+    def page(self, direction: int):
+        self.scroll(direction * self.page_size)
+
+    def shown(self) -> List[LobbyRow]:
+        return self.filtered[self.first_row:self.first_row + self.page_size]
+
+    def page_info(self) -> str:
+        pages = max(1, (len(self.filtered) + self.page_size - 1) // self.page_size)
+        page = min(pages, self.first_row // self.page_size + 1)
+        return f"Page {page}/{pages} - {len(self.filtered)} of {len(self.rows)} lobbies"
+
+
 class GameUI(arcade.Window):
     def __init__(self):
         super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, "Durka Online", fullscreen=False, resizable=True)
@@ -585,8 +830,10 @@ class GameUI(arcade.Window):
         self.set_fullscreen(False)
         self.current_language = "ru"
         self.return_button_hovered = False
-        self.game_state: Optional[GameState] = None
+        self.game_state: Optional[GameTable] = None
         self.network = NetworkManager()
+        # Бот одиночной игры считает ход в отдельном процессе, чтобы не тормозить отрисовку
+        self.bot = BotScheduler(level="normal", thinking_delay=0.6)
         self.is_animating = False
         self.winner_window = None
         self.resolution_dialog = None
@@ -600,8 +847,16 @@ class GameUI(arcade.Window):
         self.message = ""
         self.font_size = 20
         self.font_loaded = False
+        self.text_layer = TextLayer()  # Все надписи окна, см. on_draw
+        self.render = RenderScheduler()
+        self.animator = Animator()  # Движение карт, обновляется в on_update по delta_time
+        self.laid_out = None  # (версия стола, ширина, высота) на момент layout_cards()
+        self.update_rate = GAME_FRAME_INTERVAL
         self.current_screen = "main_menu"  # "main_menu", "lobby_list", "lobby", "game", "settings"
-        self.lobbies = []
+        self.lobby_browser = LobbyBrowser(lambda lobby_id: self.join_lobby(lobby_id), self)
+        self.lobbies_version = None  # версия списка на сервере, None - нет подписки
+        self.lobby_page_offset: Optional[int] = None  # Ожидаемая страница списка, None - все загружены
+        self.lobbies_removed_while_paging = 0  # Удалено лобби с запроса прошлой страницы
         self.lobby_buttons = []
         # загрузка шрифта
         self.default_font = None
@@ -614,6 +869,7 @@ class GameUI(arcade.Window):
             "button_hover": arcade.make_soft_square_texture(BUTTON_WIDTH, (200, 200, 200, 200)),
             "panel": arcade.make_soft_square_texture(100, (0, 0, 0, 180))
             }
+        CARD_TEXTURES.load()  # Все карты - при старте, во время игры файлы не читаются
         
         # Настройки звука
         self.master_volume = 1.0  # Громкость от 0.0 до 1.0
@@ -667,6 +923,7 @@ class GameUI(arcade.Window):
     def on_resize(self, width, height):
             """Вызывается при изменении размера окна"""
             super().on_resize(width, height)
+            self.render.invalidate()
             
             # Обновляем глобальные переменные с размерами
             global SCREEN_WIDTH, SCREEN_HEIGHT
@@ -679,11 +936,11 @@ class GameUI(arcade.Window):
             # Обновляем позиции карт, если игра активна
             if self.game_state:
                 self.calculate_positions()
-                for i, player in enumerate(self.game_state.players):
-                    x, y, angle = self.player_positions[i]
-                    self.position_cards(player.hand, x, y, angle, player.is_human)
+                self.layout_cards()
     def update_ui_positions(self):
         """Обновляет позиции UI элементов при изменении размера окна"""
+        if self.current_screen == "lobby_list":
+            self.setup_lobby_list_buttons()
         if self.current_screen == "settings":
             self.buttons = [
                 # Левая колонка
@@ -800,14 +1057,14 @@ class GameUI(arcade.Window):
         if (font_name == "minecraft" or 
             (self.current_font == "minecraft" and font_name is None)):
             if self.minecraft_font_name:
-                arcade.draw_text(text, x, y, color, font_size,
+                self.text_layer.draw(text, x, y, color, font_size,
                                 font_name=self.minecraft_font_name,
                                 anchor_x=anchor_x, anchor_y=anchor_y)
             else:
-                arcade.draw_text(text, x, y, color, font_size,
+                self.text_layer.draw(text, x, y, color, font_size,
                             anchor_x=anchor_x, anchor_y=anchor_y)
         else:
-            arcade.draw_text(text, x, y, color, font_size,
+            self.text_layer.draw(text, x, y, color, font_size,
                             anchor_x=anchor_x, anchor_y=anchor_y)
 
     def load_fonts(self):
@@ -933,7 +1190,7 @@ class GameUI(arcade.Window):
             )
             
             # Заголовок
-            arcade.draw_text(
+            self.text_layer.draw(
                 "Выберите разрешение",
                 SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 160,
                 arcade.color.WHITE, 24,
@@ -949,20 +1206,20 @@ class GameUI(arcade.Window):
         
         # Остальной код отрисовки настроек (только если диалог не активен)
         # Заголовок
-        arcade.draw_text("SETTINGS", SCREEN_WIDTH//2, SCREEN_HEIGHT - 100,
+        self.text_layer.draw("SETTINGS", SCREEN_WIDTH//2, SCREEN_HEIGHT - 100,
                         arcade.color.GOLD, 40, anchor_x="center", font_name=self.minecraft_font_name)
         
         # Панель настроек
         arcade.draw_rectangle_filled(SCREEN_WIDTH//2, SCREEN_HEIGHT//2, 600, 400, (0, 0, 0, 180))
         
         # Информация о текущем мониторе
-        arcade.draw_text(f"Current Monitor: {self.current_monitor_name}", 
+        self.text_layer.draw(f"Current Monitor: {self.current_monitor_name}", 
                         SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 150,
                         arcade.color.WHITE, 20, anchor_x="center")
         
         # Информация о текущем разрешении
         current_res = f"{self.width}x{self.height}" if not self.fullscreen else "Fullscreen"
-        arcade.draw_text(f"Current Resolution: {current_res}", 
+        self.text_layer.draw(f"Current Resolution: {current_res}", 
                         SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 120,
                         arcade.color.WHITE, 20, anchor_x="center")
         
@@ -988,7 +1245,6 @@ class GameUI(arcade.Window):
         self.current_screen = "game"
         self.buttons.clear()
         self.message = ""
-        self.game_state = GameState()
         
         # Один игрок — человек, другой — бот
         players_info = [
@@ -996,7 +1252,9 @@ class GameUI(arcade.Window):
             {"name": "Bot", "is_you": False}
         ]
         trump_suit = random.choice(SUITS)
-        self.game_state.init_game(players_info, trump_suit, 0)
+        self.game_state = GameTable.local(players_info, 0, trump_suit)
+        self.bot.cancel()
+        self.animator.clear()
         self.calculate_positions()
 
     def setup_load_background(self):
@@ -1054,14 +1312,95 @@ class GameUI(arcade.Window):
         
     def show_lobby_list(self):
         self.current_screen = "lobby_list"
+        self.setup_lobby_list_buttons()
+        # Поиск по названию: набранный текст сразу фильтрует список
+        self.active_input = "lobby_search"
+        self.input_text = self.lobby_browser.search_text
+        # Немедленно запрашиваем список, дальше сервер сам присылает изменения
+        self.request_lobby_list()
+
+    def setup_lobby_list_buttons(self):
+        browser = self.lobby_browser
         self.buttons = [
             Button(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 200, BUTTON_WIDTH, BUTTON_HEIGHT, 
-                "Refresh", lambda: self.network.send_message({"action": "list_lobbies"})),
+                "Refresh", lambda: self.request_lobby_list()),
             Button(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 260, BUTTON_WIDTH, BUTTON_HEIGHT, 
-                "Back", lambda: self.setup_main_menu())
+                "Back", lambda: self.close_lobby_list()),
+            Button(SCREEN_WIDTH//2 - 170, SCREEN_HEIGHT//2 - 200, 100, BUTTON_HEIGHT,
+                "<", lambda: browser.page(-1)),
+            Button(SCREEN_WIDTH//2 + 170, SCREEN_HEIGHT//2 - 200, 100, BUTTON_HEIGHT,
+                ">", lambda: browser.page(1)),
+            Button(SCREEN_WIDTH//2 + 310, SCREEN_HEIGHT - 110, 240, 36,
+                f"Joinable: {'on' if browser.joinable_only else 'off'}", lambda: self.toggle_lobby_filter("joinable")),
+            Button(SCREEN_WIDTH//2 + 310, SCREEN_HEIGHT - 150, 240, 36,
+                f"Password: {browser.password_filter}", lambda: self.toggle_lobby_filter("password")),
         ]
-        # Немедленно запрашиваем список
-        self.network.send_message({"action": "list_lobbies"})
+        # Список - между строкой поиска и кнопками
+        browser.layout(SCREEN_HEIGHT - 180, SCREEN_HEIGHT//2 - 200 + BUTTON_HEIGHT)
+
+    def toggle_lobby_filter(self, kind: str):
+        if kind == "joinable":
+            self.lobby_browser.toggle_joinable()
+        else:
+            self.lobby_browser.cycle_password_filter()
+        self.setup_lobby_list_buttons()  # Новые подписи кнопок фильтров
+        
+    def request_lobby_list(self):
+        """Полный снимок списка лобби и подписка на его изменения.
+
+        Сервер отдает список страницами: первая приходит с подпиской,
+        остальные запрашиваются по очереди в request_next_lobby_page().
+        """
+        self.lobby_page_offset = 0
+        self.lobbies_removed_while_paging = 0
+        self.network.send_message({"action": "list_lobbies", "subscribe": True,
+                                   "offset": 0, "limit": LOBBY_PAGE_SIZE})
+
+    def request_next_lobby_page(self, offset: int, count: int, total: Optional[int]):
+        if self.lobbies_version is None or total is None or count < LOBBY_PAGE_SIZE or offset + count >= total:
+            self.lobby_page_offset = None
+            return
+        # Удаленные лобби сдвигают список назад: лучше повторить пару строк, чем пропустить
+        self.lobby_page_offset = max(0, offset + count - self.lobbies_removed_while_paging)
+        self.lobbies_removed_while_paging = 0
+        self.network.send_message({"action": "list_lobbies", "offset": self.lobby_page_offset,
+                                   "limit": LOBBY_PAGE_SIZE})
+        
+    def resync_after_overflow(self):
+        """Часть сообщений потеряна при переполнении очереди - берем снимок заново"""
+        print(f"Очередь сообщений переполнена, потеряно: {self.network.inbox.dropped}")
+        if self.lobbies_version is not None:
+            self.lobbies_version = None
+            self.request_lobby_list()
+        if self.game_state and self.game_state.online and not self.game_state.resyncing:
+            self.game_state.resyncing = True
+            self.network.send_message({"action": "game_resync"})
+
+    def close_lobby_list(self):
+        self.unsubscribe_lobby_list()
+        self.active_input = None
+        self.setup_main_menu()
+        
+    def unsubscribe_lobby_list(self):
+        if self.lobbies_version is not None:
+            self.network.send_message({"action": "unsubscribe_lobbies"})
+            self.lobbies_version = None
+            
+    def apply_lobbies_delta(self, message: Dict):
+        """Применение изменений списка лобби, присланных сервером"""
+        if self.lobbies_version is None:
+            return
+        if message.get("version") != self.lobbies_version + 1:
+            # Пропустили изменение - запрашиваем снимок заново
+            self.lobbies_version = None
+            self.request_lobby_list()
+            return
+        self.lobbies_version = message["version"]
+        removed = message.get("removed", [])
+        if self.lobby_page_offset is not None:
+            self.lobbies_removed_while_paging += len(removed)
+        changed = message.get("added", []) + message.get("changed", [])
+        self.lobby_browser.update_lobbies(removed, changed)
             
     def setup_lobby(self, lobby_info):
         self.current_screen = "lobby"
@@ -1082,12 +1421,17 @@ class GameUI(arcade.Window):
         
     def setup_game(self, game_info):
         self.current_screen = "game"
-        self.game_state = GameState()
         
         # ФИКС: Правильно определяем индекс игрока
-        your_index = next((i for i, p in enumerate(game_info["players"]) if p.get("is_you")), 0)
-        
-        self.game_state.init_game(game_info["players"], game_info["trump_suit"], your_index)
+        your_index = game_info.get("your_index")
+        if your_index is None:
+            your_index = next((i for i, p in enumerate(game_info["players"]) if p.get("is_you")), 0)
+        
+        # Колоду тасует и раздает сервер, клиент только отображает стол
+        self.game_state = GameTable(game_info["players"], your_index)
+        self.animator.clear()
+        self.game_state.apply_state(game_info["state"])
+        self.game_state.seq = game_info.get("seq")
         self.calculate_positions()
         
     def create_lobby(self):
@@ -1114,6 +1458,8 @@ class GameUI(arcade.Window):
         })
         
     def join_lobby(self, lobby_id):
+        self.unsubscribe_lobby_list()
+        self.active_input = None
         self.network.send_message({
             "action": "join_lobby",
             "lobby_id": lobby_id,
@@ -1179,6 +1525,7 @@ class GameUI(arcade.Window):
             
         # Позиция колоды (слева посередине)
         self.deck_position = (SCREEN_WIDTH * 0.1, center_y, 0)
+        self.game_state.player_positions = self.player_positions
             
     def position_cards(self, cards: List[Card], pos_x: float, pos_y: float, angle: float, is_human: bool):
         """Позиционирование карт с учетом типа игрока"""
@@ -1190,13 +1537,30 @@ class GameUI(arcade.Window):
         start_x = pos_x - total_width / 2
         
         for i, card in enumerate(cards):
-            card.target_x = start_x + i * spacing
             # Для карт игрока располагаем их ниже
-            card.target_y = pos_y if not is_human else pos_y * 0.9
+            self.animator.move(card, start_x + i * spacing, pos_y if not is_human else pos_y * 0.9, MOVE_DURATION)
             card.angle = angle
             card.face_up = is_human
 
+    def layout_cards(self):
+        """Места всех карт на столе. Вызывается, когда меняется стол или окно,
+        карты не на своем месте получают анимацию переезда
+        """
+        for i, player in enumerate(self.game_state.players):
+            x, y, angle = self.player_positions[i]
+            self.position_cards(player.hand, x, y, angle, player.is_human)
+
+        # Карты на столе - горизонтально с небольшим смещением
+        field_x = SCREEN_WIDTH // 2 - (len(self.game_state.field) * CARD_WIDTH * 0.4) // 2
+        for i, card in enumerate(self.game_state.field):
+            self.animator.move(card, field_x + i * CARD_WIDTH * 0.4, SCREEN_HEIGHT // 2, THROW_DURATION)
+            card.angle = 0
+        self.laid_out = (self.game_state.version, SCREEN_WIDTH, SCREEN_HEIGHT)
+
     def on_draw(self):
+        interval = GAME_FRAME_INTERVAL if self.current_screen == "game" else MENU_FRAME_INTERVAL
+        if not self.render.begin_frame(interval):
+            return  # Ничего не изменилось - на экране остается прошлый кадр
         arcade.start_render()
         
         # Фон - теперь используем BackgroundManager
@@ -1216,10 +1580,13 @@ class GameUI(arcade.Window):
             self.draw_game()
         elif self.current_screen == "settings":
             self.draw_settings()
+        # Надписи копятся в слоях TextLayer: слой рисуется перед тем, что должно лечь поверх него
+        self.text_layer.flush()
             
         # Кнопки
         for button in self.buttons:
             button.draw()
+        self.text_layer.flush()
             
         # Диалог подтверждения
         if self.confirmation_dialog and self.confirmation_dialog["active"]:
@@ -1228,7 +1595,7 @@ class GameUI(arcade.Window):
                 600, 200,
                 arcade.color.DARK_SLATE_GRAY
             )
-            arcade.draw_text(
+            self.text_layer.draw(
                 self.confirmation_dialog["message"],
                 SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 50,
                 arcade.color.WHITE, 24,
@@ -1240,31 +1607,42 @@ class GameUI(arcade.Window):
             
         # Сообщение
         if self.message:
-            arcade.draw_text(
+            self.text_layer.draw(
                 self.message, 
                 SCREEN_WIDTH//2, 30,
                 arcade.color.WHITE, 20,
                 anchor_x="center"
             )
         if self.winner_window and self.winner_window["active"]:
+            self.text_layer.flush()
             self.draw_winner_window()
+        self.text_layer.end_frame()
         
+    def on_expose(self):
+        # Окно перекрывали - прошлый кадр мог пропасть
+        self.render.invalidate()
+
+    def flip(self):
+        # После пропущенного on_draw задний буфер не перерисован, его не показываем
+        if not self.render.skipped:
+            super().flip()
+
     def draw_main_menu(self):
         # Фоновый градиент
         arcade.draw_lrwh_rectangle_textured(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, self.background_manager.background)
         
         # Заголовок с тенью
-        arcade.draw_text("DURAK ONLINE", SCREEN_WIDTH//2 + 3, SCREEN_HEIGHT - 103,
+        self.text_layer.draw("DURAK ONLINE", SCREEN_WIDTH//2 + 3, SCREEN_HEIGHT - 103,
                         arcade.color.BLACK, 50, anchor_x="center", font_name=self.minecraft_font_name)
-        arcade.draw_text("DURAK ONLINE", SCREEN_WIDTH//2, SCREEN_HEIGHT - 100,
+        self.text_layer.draw("DURAK ONLINE", SCREEN_WIDTH//2, SCREEN_HEIGHT - 100,
                         arcade.color.GOLD, 50, anchor_x="center", font_name=self.minecraft_font_name)
         
         # Версия игры
-        arcade.draw_text("v1.0", SCREEN_WIDTH - 50, 20, arcade.color.WHITE, 12)
+        self.text_layer.draw("v1.0", SCREEN_WIDTH - 50, 20, arcade.color.WHITE, 12)
         
         # Имя игрока
         arcade.draw_rectangle_filled(SCREEN_WIDTH//2, SCREEN_HEIGHT - 160, 300, 30, (0, 0, 0, 150))
-        arcade.draw_text(f"Player: {self.player_name}", SCREEN_WIDTH//2, SCREEN_HEIGHT - 165,
+        self.text_layer.draw(f"Player: {self.player_name}", SCREEN_WIDTH//2, SCREEN_HEIGHT - 165,
                         arcade.color.WHITE, 20, anchor_x="center")
         
         # Кнопки с эффектом стекла
@@ -1274,14 +1652,14 @@ class GameUI(arcade.Window):
             arcade.draw_rectangle_outline(button.x, button.y, button.width, button.height, arcade.color.WHITE, 2)
             
             text_color = arcade.color.GOLD if button.hovered else arcade.color.WHITE
-            arcade.draw_text(button.text, button.x, button.y, text_color, 20,
+            self.text_layer.draw(button.text, button.x, button.y, text_color, 20,
                             anchor_x="center", anchor_y="center", font_name=self.minecraft_font_name)
         
     def draw_load_background(self):
-        arcade.draw_text("Load Custom Background", SCREEN_WIDTH//2, SCREEN_HEIGHT - 60, 
+        self.text_layer.draw("Load Custom Background", SCREEN_WIDTH//2, SCREEN_HEIGHT - 60, 
                         arcade.color.WHITE, 40, anchor_x="center")
         
-        arcade.draw_text("Enter path to background image:", 
+        self.text_layer.draw("Enter path to background image:", 
                          SCREEN_WIDTH//2, SCREEN_HEIGHT - 120, 
                          arcade.color.WHITE, 20, anchor_x="center")
         
@@ -1294,13 +1672,13 @@ class GameUI(arcade.Window):
         text = self.input_text
         if self.active_input and int(time.time()) % 2 == 0:  # Мигающий курсор
             text += "|"
-        arcade.draw_text(text, SCREEN_WIDTH//2 - 290, SCREEN_HEIGHT//2 - 70, 
+        self.text_layer.draw(text, SCREEN_WIDTH//2 - 290, SCREEN_HEIGHT//2 - 70, 
                         arcade.color.WHITE, 20)
         
     def draw_create_lobby(self):
-        arcade.draw_text("Create Lobby", SCREEN_WIDTH//2, SCREEN_HEIGHT - 100, 
+        self.text_layer.draw("Create Lobby", SCREEN_WIDTH//2, SCREEN_HEIGHT - 100, 
                         arcade.color.WHITE, 40, anchor_x="center")
-        arcade.draw_text("Lobby Name:", SCREEN_WIDTH//2 - 150, SCREEN_HEIGHT//2 + 20, 
+        self.text_layer.draw("Lobby Name:", SCREEN_WIDTH//2 - 150, SCREEN_HEIGHT//2 + 20, 
                         arcade.color.WHITE, 20)
         
         # Рисуем поле ввода с индикатором активного состояния
@@ -1312,40 +1690,39 @@ class GameUI(arcade.Window):
         text = self.input_text
         if self.active_input and int(time.time()) % 2 == 0:  # Мигающий курсор
             text += "|"
-        arcade.draw_text(text, SCREEN_WIDTH//2 - 140, SCREEN_HEIGHT//2 - 10, 
+        self.text_layer.draw(text, SCREEN_WIDTH//2 - 140, SCREEN_HEIGHT//2 - 10, 
                         arcade.color.WHITE, 20)
         
     def draw_lobby_list(self):
-        arcade.draw_text("Available Lobbies", SCREEN_WIDTH//2, SCREEN_HEIGHT - 60, 
+        self.text_layer.draw("Available Lobbies", SCREEN_WIDTH//2, SCREEN_HEIGHT - 60, 
                         arcade.color.WHITE, 30, anchor_x="center")
+        browser = self.lobby_browser
+
+        # Строка поиска
+        color = arcade.color.LIGHT_BLUE if self.active_input == "lobby_search" else arcade.color.WHITE
+        arcade.draw_rectangle_filled(SCREEN_WIDTH//2 - 80, SCREEN_HEIGHT - 130, 400, 36, arcade.color.BLACK)
+        arcade.draw_rectangle_outline(SCREEN_WIDTH//2 - 80, SCREEN_HEIGHT - 130, 400, 36, color, 2)
+        self.text_layer.draw(f"Search: {self.input_text if self.active_input == 'lobby_search' else browser.search_text}",
+                             SCREEN_WIDTH//2 - 270, SCREEN_HEIGHT - 138, arcade.color.WHITE, 16)
         
         # Рисуем сообщение, если лобби нет
-        if not self.lobbies:
-            arcade.draw_text("No lobbies available", SCREEN_WIDTH//2, SCREEN_HEIGHT//2, 
+        if not browser.filtered:
+            text = "No lobbies available" if not browser.rows else "No lobbies match the filters"
+            self.text_layer.draw(text, SCREEN_WIDTH//2, SCREEN_HEIGHT//2, 
                             arcade.color.WHITE, 20, anchor_x="center")
         
-        # Рисуем список лобби и кнопки
-        self.lobby_buttons = []  # Очищаем старые кнопки
-        for i, lobby in enumerate(self.lobbies):
-            y_pos = SCREEN_HEIGHT - 120 - i * 60
-            
-            # Рисуем информацию о лобби
-            arcade.draw_text(
-                f"{lobby['name']} ({lobby['player_count']}/{lobby['max_players']})", 
-                SCREEN_WIDTH//2 - 200, y_pos, 
-                arcade.color.WHITE, 20
-            )
-            
-            # Создаем и рисуем кнопку Join, если лобби не начато
-            if not lobby["game_started"]:
-                btn = Button(
-                    SCREEN_WIDTH//2 + 200, y_pos, 
-                    100, 30, 
-                    "Join", 
-                    lambda l=lobby: self.join_lobby(l["id"])
-                )
-                btn.draw()
-                self.lobby_buttons.append(btn)
+        # Только строки, попавшие в окно прокрутки; кнопки строк созданы заранее
+        self.lobby_buttons = []
+        for i, row in enumerate(browser.shown()):
+            y_pos = SCREEN_HEIGHT - 180 - i * browser.ROW_HEIGHT - browser.ROW_HEIGHT // 2
+            self.text_layer.draw(row.text, SCREEN_WIDTH//2 - 280, y_pos - 8, arcade.color.WHITE, 20)
+            if row.button:
+                row.button.x, row.button.y = SCREEN_WIDTH//2 + 230, y_pos
+                row.button.draw()
+                self.lobby_buttons.append(row.button)
+
+        self.text_layer.draw(browser.page_info(), SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 160,
+                             arcade.color.LIGHT_GRAY, 14, anchor_x="center")
                 
     def draw_lobby(self):
         if not self.current_lobby:
@@ -1355,22 +1732,22 @@ class GameUI(arcade.Window):
         arcade.draw_lrwh_rectangle_textured(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT, self.background_manager.background)
         
         # Заголовок
-        arcade.draw_text(f"LOBBY: {self.current_lobby['name']}", SCREEN_WIDTH//2, SCREEN_HEIGHT - 100,
+        self.text_layer.draw(f"LOBBY: {self.current_lobby['name']}", SCREEN_WIDTH//2, SCREEN_HEIGHT - 100,
                         arcade.color.GOLD, 30, anchor_x="center", font_name=self.minecraft_font_name)
         
         # Панель игроков
         arcade.draw_rectangle_filled(SCREEN_WIDTH//2, SCREEN_HEIGHT//2, 400, 300, (0, 0, 0, 180))
-        arcade.draw_text("PLAYERS:", SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 120, arcade.color.WHITE, 24, anchor_x="center")
+        self.text_layer.draw("PLAYERS:", SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 120, arcade.color.WHITE, 24, anchor_x="center")
         
         for i, player in enumerate(self.current_lobby["players"]):
             color = arcade.color.GOLD if player == self.player_name else arcade.color.WHITE
-            arcade.draw_text(f"• {player}", SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 80 - i * 40, color, 20, anchor_x="center")
+            self.text_layer.draw(f"• {player}", SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 80 - i * 40, color, 20, anchor_x="center")
         
         # Кнопки
         for button in self.buttons:
             color = (200, 200, 200, 200) if button.hovered else (100, 100, 100, 200)
             arcade.draw_rectangle_filled(button.x, button.y, button.width, button.height, color)
-            arcade.draw_text(button.text, button.x, button.y, arcade.color.WHITE, 20,
+            self.text_layer.draw(button.text, button.x, button.y, arcade.color.WHITE, 20,
                             anchor_x="center", anchor_y="center", font_name=self.minecraft_font_name)
             
     def draw_game(self):
@@ -1393,33 +1770,24 @@ class GameUI(arcade.Window):
         
         # Информационная панель
         arcade.draw_rectangle_filled(SCREEN_WIDTH // 2, 30, SCREEN_WIDTH, 60, (0, 0, 0, 150))
-        arcade.draw_text(f"Trump: {self.game_state.trump_suit} | Phase: {self.game_state.game_phase} | Cards left: {len(self.game_state.deck)}", 
+        self.text_layer.draw(f"Trump: {self.game_state.trump_suit} | Phase: {self.game_state.game_phase} | Cards left: {self.game_state.cards_left()}", 
                         SCREEN_WIDTH // 2, 30, arcade.color.WHITE, 18, anchor_x="center")
         
-        # Карты игроков с анимацией
+        # Карты игроков
         for i, player in enumerate(self.game_state.players):
             x, y, angle = self.player_positions[i]
-            self.position_cards(player.hand, x, y, angle, player.is_human)
             
             # Имя игрока
             name_color = arcade.color.GOLD if i == self.game_state.current_player_idx else arcade.color.WHITE
-            arcade.draw_text(player.name + (" (You)" if player.is_human else ""), 
+            self.text_layer.draw(player.name + (" (You)" if player.is_human else ""), 
                             x, y - 120, name_color, 16, anchor_x="center")
             
             # Карты игрока
-            for card in player.hand:
-                card.draw()
-
-        field_x = SCREEN_WIDTH // 2 - (len(self.game_state.field) * CARD_WIDTH * 0.4) // 2
-        field_y = SCREEN_HEIGHT // 2
+            self.game_state.hand_sprites[i].draw()
+        self.game_state.outline_sprites.draw()
 
         # Карты на столе
-        for i, card in enumerate(self.game_state.field):
-            # Позиционируем карты горизонтально с небольшим смещением
-            card.target_x = field_x + i * CARD_WIDTH * 0.4
-            card.target_y = field_y
-            card.angle = 0
-            card.draw()
+        self.game_state.field_sprites.draw()
             
         # Кнопки действий с эффектом свечения
         if self.game_state.players[self.game_state.current_player_idx].is_human:
@@ -1427,17 +1795,13 @@ class GameUI(arcade.Window):
             arcade.draw_rectangle_outline(SCREEN_WIDTH - 100, 100, 150, 100, arcade.color.WHITE, 2)
             
             play_color = arcade.color.GREEN if self.selected_card_idx >= 0 else arcade.color.GRAY
-            arcade.draw_text("PLAY", SCREEN_WIDTH - 100, 70, play_color, 20, anchor_x="center")
-            arcade.draw_text("PASS", SCREEN_WIDTH - 100, 130, arcade.color.RED, 20, anchor_x="center")
-
-        if self.game_state.deck:
-            arcade.draw_texture_rectangle(
-                SCREEN_WIDTH * 0.1, SCREEN_HEIGHT // 2,
-                CARD_WIDTH, CARD_HEIGHT,
-                arcade.load_texture("card/card_back.png")
-            )
-            arcade.draw_text(
-                f"{len(self.game_state.deck)}", 
+            self.text_layer.draw("PLAY", SCREEN_WIDTH - 100, 70, play_color, 20, anchor_x="center")
+            self.text_layer.draw("PASS", SCREEN_WIDTH - 100, 130, arcade.color.RED, 20, anchor_x="center")
+
+        if self.game_state.cards_left():
+            self.game_state.deck_sprites.draw()
+            self.text_layer.draw(
+                f"{self.game_state.cards_left()}", 
                 SCREEN_WIDTH * 0.1, SCREEN_HEIGHT // 2 - CARD_HEIGHT//2 - 20,
                 arcade.color.WHITE, 20, anchor_x="center"
             )
@@ -1463,6 +1827,7 @@ class GameUI(arcade.Window):
             )
 
     def on_mouse_press(self, x, y, button, modifiers):
+        self.render.invalidate()
         if button == arcade.MOUSE_BUTTON_LEFT:
             # Воспроизводим звук нажатия
             self.sound_manager.play_sound("button_click")
@@ -1487,6 +1852,8 @@ class GameUI(arcade.Window):
                 self.winner_window["active"] = False
                 self.winner_window = None
                 self.game_state = None
+                self.bot.cancel()
+                self.animator.clear()
                 self.setup_main_menu()
                 return
             # Если мы в игровом экране, обрабатываем клики игры
@@ -1494,6 +1861,13 @@ class GameUI(arcade.Window):
                 self.handle_game_click(x, y)
                 return
                 
+            # Клик по строке поиска в списке лобби
+            if (self.current_screen == "lobby_list" and abs(x - (SCREEN_WIDTH//2 - 80)) <= 200 and
+                    abs(y - (SCREEN_HEIGHT - 130)) <= 18):
+                self.active_input = "lobby_search"
+                self.input_text = self.lobby_browser.search_text
+                return
+
             # Проверяем основные кнопки
             for btn in self.buttons:
                 if btn.check_hover(x, y) and btn.action:
@@ -1509,11 +1883,13 @@ class GameUI(arcade.Window):
 
                 
     def on_mouse_release(self, x, y, button, modifiers):
+        self.render.invalidate()
         if button == arcade.MOUSE_BUTTON_LEFT:
             if self.current_screen == "settings":
                 self.volume_slider["dragging"] = False
 
     def on_mouse_drag(self, x, y, dx, dy, buttons, modifiers):
+        self.render.invalidate()
         if buttons == arcade.MOUSE_BUTTON_LEFT:
             if self.current_screen == "settings" and self.volume_slider["dragging"]:
                 self.handle_volume_slider(x, y)
@@ -1543,6 +1919,10 @@ class GameUI(arcade.Window):
         # Кнопка паса/игры
         if (SCREEN_WIDTH - 175 < x < SCREEN_WIDTH - 25 and 
             50 < y < 150):
+            if self.game_state.online:
+                # Ход проверяет сервер, в ответ придет новое состояние стола
+                self.send_game_action(y > 100, current_player)
+                return
             if y > 100:  # Pass
                 if self.game_state.pass_move(self.game_state.current_player_idx):
                     self.message = self.tr("you_take_cards")
@@ -1560,9 +1940,7 @@ class GameUI(arcade.Window):
                 if self.selected_card_idx >= 0:
                     card = current_player.hand[self.selected_card_idx]
                     # Проверяем валидность хода перед броском
-                    if ((self.game_state.game_phase == "attack" and not self.game_state.is_valid_attack(card)) or
-                        (self.game_state.game_phase == "defense" and not self.game_state.is_valid_defense(card)) or
-                        (self.game_state.game_phase == "throw" and not self.game_state.is_valid_throw(card))):
+                    if not self.game_state.is_valid_move(card):
                         self.message = self.tr("invalid_move")
                         return
                     
@@ -1570,10 +1948,8 @@ class GameUI(arcade.Window):
                     center_x = SCREEN_WIDTH // 2
                     center_y = SCREEN_HEIGHT * 0.35  # Ниже центра, ближе к игроку
                     
-                    # Запускаем анимацию
-                    card.start_animation('throw', (card.x, card.y))
-                    card.target_x = center_x  # Устанавливаем конечную позицию
-                    card.target_y = center_y
+                    # Запускаем анимацию (после хода карта поедет на свое место на столе)
+                    self.animator.move(card, center_x, center_y, THROW_DURATION)
                     
                     if self.game_state.make_move(self.game_state.current_player_idx, self.selected_card_idx):
                         # Воспроизводим звук карты
@@ -1583,7 +1959,21 @@ class GameUI(arcade.Window):
                         self.message = self.tr("invalid_move")
                     self.selected_card_idx = -1
                 
+    def send_game_action(self, is_pass: bool, player: Player):
+        table = self.game_state
+        if table.current_player_idx != table.your_index:
+            return  # Не наш ход - сервер все равно ответит "Invalid move"
+        if is_pass:
+            if table.game_phase == "attack":
+                return  # Атакующий не может пасовать, пока стол пуст
+            self.network.send_message({"action": "game_action", "type": "pass"})
+        elif self.selected_card_idx >= 0:
+            card = player.hand[self.selected_card_idx]
+            self.network.send_message({"action": "game_action", "type": "play", "card": card.key})
+        self.selected_card_idx = -1
+        
     def on_key_press(self, key, modifiers):
+        self.render.invalidate()
         if self.active_input:
             if key == arcade.key.BACKSPACE:
                 self.input_text = self.input_text[:-1]
@@ -1591,27 +1981,64 @@ class GameUI(arcade.Window):
                 self.active_input = None
             elif key == arcade.key.SPACE:
                 self.input_text += " "
+            self.update_lobby_search()
+        elif self.current_screen == "lobby_list":
+            self.scroll_lobby_list(key)
 
     def on_text(self, text):
+        self.render.invalidate()
         if self.active_input:
             self.input_text += text
+            self.update_lobby_search()
+
+    def update_lobby_search(self):
+        if self.active_input == "lobby_search":
+            self.lobby_browser.set_query(self.input_text)
+
+    def scroll_lobby_list(self, key):
+        browser = self.lobby_browser
+        if key == arcade.key.PAGEUP:
+            browser.page(-1)
+        elif key == arcade.key.PAGEDOWN:
+            browser.page(1)
+        elif key == arcade.key.UP:
+            browser.scroll(-1)
+        elif key == arcade.key.DOWN:
+            browser.scroll(1)
+        elif key == arcade.key.HOME:
+            browser.scroll_to(0)
+        elif key == arcade.key.END:
+            browser.scroll_to(len(browser.filtered))
+        elif key == arcade.key.SLASH:
+            # Вернуться к поиску после Enter/Esc
+            self.active_input = "lobby_search"
+            self.input_text = browser.search_text
+
+    def on_mouse_scroll(self, x, y, scroll_x, scroll_y):
+        self.render.invalidate()
+        if self.current_screen == "lobby_list":
+            self.lobby_browser.scroll(-int(scroll_y) * LobbyBrowser.SCROLL_ROWS)
 
                 
     def on_update(self, delta_time):
-        # Обновление анимаций
+        # Обновление анимаций: только карты в движении
+        if self.game_state and self.laid_out != (self.game_state.version, SCREEN_WIDTH, SCREEN_HEIGHT):
+            self.layout_cards()
+        self.animator.update(delta_time)
         if self.game_state:
-            for player in self.game_state.players:
-                for card in player.hand:
-                    card.update()
-            for card in self.game_state.field:
-                card.update()
                 
             # Проверка времени хода
+            current_player = self.game_state.players[self.game_state.current_player_idx]
             if time.time() - self.game_state.last_move_time > self.game_state.move_timeout:
                 self.message = "Player timeout - passing turn"
-                self.game_state.pass_move(self.game_state.current_player_idx)
+                if not self.game_state.online:
+                    self.game_state.pass_move(self.game_state.current_player_idx)
+                else:
+                    # В сетевой игре пас за себя отправляем на сервер (если он сейчас возможен)
+                    self.send_game_action(True, current_player)
+                    self.game_state.last_move_time = time.time()
             
-            if self.game_state and not self.game_state.players[self.game_state.current_player_idx].is_human:
+            if not self.game_state.online and not current_player.is_human:
                 self.make_bot_move()
 
             # Проверка конца игры
@@ -1628,10 +2055,28 @@ class GameUI(arcade.Window):
                     "active": True
                 }
                 self.sound_manager.play_sound("win")
-        # Обработка сетевых сообщений
-        while self.network.message_queue:
-            message = self.network.message_queue.pop(0)
+        # Обработка сетевых сообщений: не дольше бюджета кадра, остальное - в следующем
+        for message in self.network.inbox.drain():
             self.process_network_message(message)
+            self.render.invalidate()
+        if self.network.inbox.take_overflow():
+            self.resync_after_overflow()
+        self.schedule_frames(self.animator.active)
+
+    def schedule_frames(self, animating: bool):
+        """Что должно вызвать перерисовку, и частота on_update для текущего экрана"""
+        self.render.animating = animating
+        buttons = self.buttons + self.lobby_buttons + self.resolution_buttons
+        self.render.watch((
+            self.current_screen, self.message, self.selected_card_idx,
+            self.game_state.version if self.game_state else None,
+            self.winner_window is not None, self.return_button_hovered,
+            tuple(button.hovered for button in buttons),
+        ))
+        update_rate = GAME_FRAME_INTERVAL if self.current_screen == "game" else MENU_UPDATE_RATE
+        if update_rate != self.update_rate:
+            self.update_rate = update_rate
+            self.set_update_rate(update_rate)
     
     def draw_winner_window(self):
         if not self.winner_window or not self.winner_window["active"]:
@@ -1653,14 +2098,14 @@ class GameUI(arcade.Window):
         )
         
         # Текст с победителем
-        arcade.draw_text(
+        self.text_layer.draw(
             "ПОБЕДА!",
             SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 100,
             arcade.color.GOLD, 40,
             anchor_x="center", anchor_y="center",
             font_name=self.minecraft_font_name
         )
-        arcade.draw_text(
+        self.text_layer.draw(
             f"Победитель: {self.winner_window['winner']}",
             SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 40,
             arcade.color.WHITE, 24,
@@ -1675,7 +2120,7 @@ class GameUI(arcade.Window):
             200, 50,
             color
         )
-        arcade.draw_text(
+        self.text_layer.draw(
             "Вернуться",
             SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 60,
             arcade.color.WHITE, 24,
@@ -1684,56 +2129,33 @@ class GameUI(arcade.Window):
         )
 
     def make_bot_move(self):
-        bot = self.game_state.players[self.game_state.current_player_idx]
-        
-        if self.game_state.game_phase == "attack":
-            for i, card in enumerate(bot.hand):
-                if self.game_state.is_valid_attack(card):
-                    card.face_up = True  # Переворачиваем карту при броске
-                    self.game_state.make_move(bot.idx, i)
-                    return
-                    
-        elif self.game_state.game_phase == "defense":
-            attacking_card = self.game_state.field[-1]
-            valid_defense_cards = []
-            for i, card in enumerate(bot.hand):
-                if self.game_state.can_beat(attacking_card, card):
-                    valid_defense_cards.append((i, card))
-            
-            if valid_defense_cards:
-                # Сначала пробуем отбиться картой той же масти
-                same_suit = [c for c in valid_defense_cards if c[1].suit == attacking_card.suit]
-                if same_suit:
-                    same_suit.sort(key=lambda x: RANK_VALUES[x[1].rank])  # Выбираем минимальную карту той же масти
-                    chosen_card = same_suit[0]
-                else:
-                    # Иначе используем минимальный козырь
-                    valid_defense_cards.sort(key=lambda x: (x[1].suit != self.game_state.trump_suit, RANK_VALUES[x[1].rank]))
-                    chosen_card = valid_defense_cards[0]
-                card.face_up = True
-                self.game_state.make_move(bot.idx, chosen_card[0])
-                return
-            else:
-                # Если не можем отбиться - забираем карты
-                self.game_state.pass_move(bot.idx)
-            
-        elif self.game_state.game_phase == "throw":
-            valid_throw_cards = []
-            for i, card in enumerate(bot.hand):
-                if self.game_state.is_valid_throw(card):
-                    valid_throw_cards.append((i, card))
-            
-            if valid_throw_cards:
-                # Подкидываем карты с наименьшим достоинством
-                valid_throw_cards.sort(key=lambda x: RANK_VALUES[x[1].rank])
-                chosen_card = valid_throw_cards[0]
-                card.face_up = True
-                self.game_state.make_move(bot.idx, chosen_card[0])
-                return
-            else:
-                # Если нечего подкинуть - завершаем кон
-                self.game_state.pass_move(bot.idx)
+        """Вызывается каждый кадр, пока ходит бот: ход применяется, когда BotScheduler его досчитал"""
+        engine = self.game_state.engine
+        bot_idx = engine.current_player_idx
+        ready, card_idx = self.bot.poll(engine)
+        if not ready:
+            return
+        if card_idx is None:
+            # Нечем отбиться или подкинуть - забираем карты / завершаем кон
+            self.game_state.pass_move(bot_idx)
+        else:
+            self.game_state.make_move(bot_idx, card_idx)
+
+    def apply_game_delta(self, message: Dict):
+        table = self.game_state
+        if table.resyncing:
+            return  # До снимка изменения применять не к чему
+        if table.seq is None or message.get("seq") != table.seq + 1:
+            print(f"Пропущено изменение стола ({table.seq} -> {message.get('seq')}), запрашиваем снимок")
+            table.resyncing = True
+            self.network.send_message({"action": "game_resync"})
+            return
+        table.apply_delta(message)
+        table.seq = message["seq"]
 
+    def on_close(self):
+        self.bot.shutdown()
+        super().on_close()
 
     def process_network_message(self, message: Dict):
         print("Получено сообщение от сервера:", message)
@@ -1747,12 +2169,25 @@ class GameUI(arcade.Window):
         action = message.get("action")
         
         if action == "lobbies_list":
-            self.lobbies = message.get("lobbies", [])
-            print(f"Обновлен список лобби: {len(self.lobbies)} доступно")
+            offset, page = message.get("offset", 0), message.get("lobbies", [])
+            if offset != self.lobby_page_offset:
+                return  # Ответ на устаревший запрос
+            # Список живет только в LobbyBrowser.rows
+            if offset == 0:
+                self.lobby_browser.set_lobbies(page)
+            else:
+                self.lobby_browser.update_lobbies([], page)
+            if message.get("subscribed"):
+                self.lobbies_version = message.get("version")
+            self.request_next_lobby_page(offset, len(page), message.get("total"))
+            print(f"Обновлен список лобби: {len(self.lobby_browser.rows)} доступно")
         # Принудительно обновляем экран
             if self.current_screen == "lobby_list":
                 arcade.schedule(lambda delta_time: None, 0)  # Триггер обновления экрана
             
+        elif action == "lobbies_delta":
+            self.apply_lobbies_delta(message)
+            
         elif action == "lobby_update":
             self.current_lobby = message.get("lobby")
             if self.current_lobby:
@@ -1771,36 +2206,21 @@ class GameUI(arcade.Window):
             
         elif action == "game_state":
             print("Обновление состояния игры")
-            if self.game_state:
-                self.game_state.field = []
-                for card_info in message.get('field', []):
-                    # Создаем карту и устанавливаем face_up=True
-                    card = Card(card_info['suit'], card_info['rank'])
-                    card.face_up = True  # Важное исправление!
-                    self.game_state.field.append(card)
-                self.game_state.current_player_idx = message.get('current_player_idx', 0)
-                self.game_state.game_phase = message.get('game_phase', 'attack')
+            if self.game_state and self.game_state.online:
+                # Полный снимок: при входе в игру или по запросу game_resync
+                self.game_state.apply_state(message)
+                self.game_state.seq = message.get("seq")
+                self.game_state.resyncing = False
+
+        elif action == "game_delta":
+            if self.game_state and self.game_state.online:
+                self.apply_game_delta(message)
             
         elif action == "success":
             success_msg = message.get("message", "")
             print(f"Успешная операция: {success_msg}")
             self.message = success_msg
 
-        elif action == "game_action":
-            # Обработка ходов других игроков
-            player_idx = message.get("player_idx")
-            action_type = message.get("type")
-            card_key = message.get("card")
-            
-            if action_type == "play" and card_key:
-                # ФИКС: Устанавливаем видимость карты
-                rank, suit = card_key.split("_")  # Разделяем по подчеркиванию
-                card = Card(suit, rank)
-                card.face_up = True  # ВАЖНО: Делаем карту видимой
-                card.x = self.player_positions[player_idx][0]
-                card.y = self.player_positions[player_idx][1]
-                card.start_animation('throw', (card.x, card.y))
-                self.game_state.field.append(card)
 
 def main():
     window = GameUI()
@@ -0,0 +1,290 @@
+import random
+from typing import Dict, List, Optional
+
+from bitboard import (CARD_BITS, CARD_INDEX, CARD_KEYS, RANK_MASKS, RANKS, SUIT_MASKS, SUITS, lowest,
+                      mask_of, rank_presence, suit_of)
+from move_tables import tables_for
+
+# Правила игры без графики и сети: используется сервером (одна партия на лобби)
+# и клиентом для одиночной игры. Карта - строковый ключ вида "10_♠",
+# внутри движка руки и стол дублируются битовыми масками (см. bitboard.py),
+# допустимые ходы берутся из таблиц move_tables.py.
+
+RANK_VALUES = {rank: i for i, rank in enumerate(RANKS)}
+HAND_SIZE = 6
+
+
+def card_key(suit: str, rank: str) -> str:
+    return f"{rank}_{suit}"
+
+
+def card_rank(key: str) -> str:
+    return key.split("_")[0]
+
+
+def card_suit(key: str) -> str:
+    return key.split("_")[1]
+
+
+def new_deck() -> List[str]:
+    return [card_key(suit, rank) for suit in SUITS for rank in RANKS]
+
+
+def can_beat(attacking_card: str, defending_card: str, trump_suit: str) -> bool:
+    return tables_for(trump_suit).can_beat(CARD_INDEX[attacking_card], CARD_INDEX[defending_card])
+
+
+class DurakEngine:
+    """Партия в дурака: колода, руки, стол и переходы между фазами.
+
+    Фазы: "attack" - первая карта кона, "defense" - защищающийся отбивает
+    последнюю карту, "throw" - атакующий подкидывает карту того же ранга.
+    Списки hands/field хранят порядок карт, hand_masks/field_mask - те же
+    карты битами, по ним считаются допустимые ходы. public_masks и
+    discard_mask - открытая информация (забранные со стола карты и бито),
+    move_number растет с каждым ходом.
+    """
+
+    def __init__(self, player_names: List[str], trump_suit: Optional[str] = None,
+                 rng: Optional[random.Random] = None):
+        self.rng = rng or random.Random()
+        self.player_names = list(player_names)
+        self.hands: List[List[str]] = [[] for _ in self.player_names]
+        self.deck: List[str] = []
+        self.field: List[str] = []
+        self.hand_masks: List[int] = [0 for _ in self.player_names]
+        self.field_mask = 0
+        self.public_masks: List[int] = [0 for _ in self.player_names]
+        self.discard_mask = 0
+        self.move_number = 0
+        self.trump_suit = trump_suit or self.rng.choice(SUITS)
+        self.trump_index = SUITS.index(self.trump_suit)
+        self.tables = tables_for(self.trump_suit)
+        self.current_player_idx = 0
+        self.game_phase = "attack"
+        self.attacker_idx = 0
+        self.winner: Optional[int] = None
+
+    def deal(self):
+        """Одна тасовка на партию и раздача по HAND_SIZE карт"""
+        self.deck = new_deck()
+        self.rng.shuffle(self.deck)
+        for _ in range(HAND_SIZE):
+            for hand in self.hands:
+                if self.deck:
+                    hand.append(self.deck.pop())
+        self.hand_masks = [mask_of(hand) for hand in self.hands]
+        self.determine_first_player()
+
+    def copy(self) -> 'DurakEngine':
+        """Независимая копия партии для перебора ходов ботом"""
+        other = DurakEngine.__new__(DurakEngine)
+        other.__dict__.update(self.__dict__)
+        other.hands = [list(hand) for hand in self.hands]
+        other.deck = list(self.deck)
+        other.field = list(self.field)
+        other.hand_masks = list(self.hand_masks)
+        other.public_masks = list(self.public_masks)
+        return other
+
+    def determine_first_player(self):
+        # Ходит игрок с младшим козырем
+        min_trump = None
+        for i, hand in enumerate(self.hands):
+            for card in hand:
+                if card_suit(card) == self.trump_suit:
+                    if min_trump is None or RANK_VALUES[card_rank(card)] < RANK_VALUES[card_rank(min_trump)]:
+                        min_trump = card
+                        self.attacker_idx = i
+        self.current_player_idx = self.attacker_idx
+
+    def can_beat(self, attacking_card: str, defending_card: str) -> bool:
+        return self.tables.can_beat(CARD_INDEX[attacking_card], CARD_INDEX[defending_card])
+
+    def moves_mask(self, hand_mask: int) -> int:
+        """Карты из hand_mask, которыми можно сходить в текущей фазе"""
+        # Защищаться нужно только от неотбитой карты - при нечетном числе карт на столе
+        last_card = CARD_INDEX[self.field[-1]] if len(self.field) % 2 == 1 else None
+        return self.tables.legal_moves(self.game_phase, hand_mask, self.field_mask, last_card)
+
+    def is_valid_move(self, card: str) -> bool:
+        return bool(self.moves_mask(CARD_BITS[card]))
+
+    def legal_mask(self, player_idx: int) -> int:
+        """Битовая маска карт игрока, которыми он может сейчас сходить"""
+        if player_idx != self.current_player_idx:
+            return 0
+        return self.moves_mask(self.hand_masks[player_idx])
+
+    def valid_moves(self, player_idx: int) -> List[int]:
+        """Индексы карт в руке, которыми игрок может сейчас сходить"""
+        legal = self.legal_mask(player_idx)
+        if not legal:
+            return []
+        return [i for i, card in enumerate(self.hands[player_idx]) if CARD_BITS[card] & legal]
+
+    def play_card(self, player_idx: int, card: str) -> bool:
+        hand = self.hands[player_idx]
+        if card not in hand:
+            return False
+        return self.make_move(player_idx, hand.index(card))
+
+    def make_move(self, player_idx: int, card_idx: int) -> bool:
+        if player_idx != self.current_player_idx or self.winner is not None:
+            return False
+
+        hand = self.hands[player_idx]
+        if card_idx < 0 or card_idx >= len(hand):
+            return False
+        if not self.is_valid_move(hand[card_idx]):
+            return False
+
+        card = hand.pop(card_idx)
+        self.field.append(card)
+        self.hand_masks[player_idx] &= ~CARD_BITS[card]
+        self.public_masks[player_idx] &= ~CARD_BITS[card]
+        self.field_mask |= CARD_BITS[card]
+        self.move_number += 1
+
+        # Логика перехода между фазами
+        if self.game_phase == "attack":
+            self.game_phase = "defense"
+            self.current_player_idx = (player_idx + 1) % len(self.hands)
+
+        elif self.game_phase == "defense":
+            if len(self.field) % 2 == 0:  # Четное количество карт = все отбито
+                self.game_phase = "throw"
+                self.current_player_idx = self.attacker_idx
+            else:
+                self.current_player_idx = player_idx
+
+        elif self.game_phase == "throw":
+            self.game_phase = "defense"
+            self.current_player_idx = (self.attacker_idx + 1) % len(self.hands)
+
+        return True
+
+    def pass_move(self, player_idx: int) -> bool:
+        if player_idx != self.current_player_idx or self.winner is not None:
+            return False
+
+        if self.game_phase == "defense":
+            # Защищающийся не отбился и забирает карты со стола
+            self.hands[player_idx].extend(self.field)
+            self.hand_masks[player_idx] |= self.field_mask
+            self.public_masks[player_idx] |= self.field_mask
+        elif self.game_phase == "throw":
+            self.discard_mask |= self.field_mask  # Все отбито - карты уходят в бито
+        else:
+            return False
+
+        # Завершение кона и переход хода
+        self.field.clear()
+        self.field_mask = 0
+        self.refill_hands()
+        self.attacker_idx = (self.attacker_idx + 1) % len(self.hands)
+        self.current_player_idx = self.attacker_idx
+        self.game_phase = "attack"
+        self.move_number += 1
+        return True
+
+    def refill_hands(self) -> List[List[str]]:
+        """Добор до HAND_SIZE: сначала атакующий, затем защищающийся.
+
+        Возвращает добранные карты по игрокам.
+        """
+        drawn: List[List[str]] = [[] for _ in self.hands]
+        order = [self.attacker_idx, (self.attacker_idx + 1) % len(self.hands)]
+        for player_idx in order:
+            hand = self.hands[player_idx]
+            while len(hand) < HAND_SIZE and self.deck:
+                card = self.deck.pop()
+                hand.append(card)
+                self.hand_masks[player_idx] |= CARD_BITS[card]
+                drawn[player_idx].append(card)
+        return drawn
+
+    def check_game_over(self) -> bool:
+        if self.winner is not None:
+            return True
+        for i, hand in enumerate(self.hands):
+            if not hand:
+                self.winner = i
+                return True
+        return False
+
+    def state_for(self, player_idx: int) -> Dict:
+        """Компактное состояние стола с точки зрения игрока: чужие руки - только размер"""
+        return {
+            "hand": list(self.hands[player_idx]),
+            "hand_sizes": [len(hand) for hand in self.hands],
+            "field": list(self.field),
+            "deck_size": len(self.deck),
+            "trump_suit": self.trump_suit,
+            "game_phase": self.game_phase,
+            "current_player_idx": self.current_player_idx,
+            "attacker_idx": self.attacker_idx,
+            "winner": self.winner
+        }
+
+
+STATE_SCALARS = ("deck_size", "trump_suit", "game_phase", "current_player_idx", "attacker_idx", "winner")
+
+
+def state_delta(old: Dict, new: Dict) -> Dict:
+    """Изменения между двумя state_for() одного игрока.
+
+    Карты в руке и на столе только добавляются в конец или убираются, порядок
+    остальных не меняется, поэтому обычно хватает hand_remove/hand_add и
+    field_add. Если список поменялся иначе (стол ушел в бито или в руку),
+    передается целиком - ключи "hand" и "field". Остальные поля - только
+    изменившиеся.
+    """
+    delta = {}
+    old_hand, new_hand = old["hand"], new["hand"]
+    if old_hand != new_hand:
+        new_cards = set(new_hand)
+        kept = [card for card in old_hand if card in new_cards]
+        if new_hand[:len(kept)] == kept:
+            if len(kept) != len(old_hand):
+                delta["hand_remove"] = [card for card in old_hand if card not in new_cards]
+            if len(new_hand) != len(kept):
+                delta["hand_add"] = new_hand[len(kept):]
+        else:
+            delta["hand"] = new_hand
+    old_field, new_field = old["field"], new["field"]
+    if old_field != new_field:
+        if new_field[:len(old_field)] == old_field:
+            delta["field_add"] = new_field[len(old_field):]
+        else:
+            delta["field"] = new_field
+    if old["hand_sizes"] != new["hand_sizes"]:
+        delta["hand_sizes"] = new["hand_sizes"]
+    for key in STATE_SCALARS:
+        if old[key] != new[key]:
+            delta[key] = new[key]
+    return delta
+
+
+def greedy_move(engine: DurakEngine, player_idx: int) -> Optional[int]:
+    """Простой бот: индекс карты для хода или None - пас (забрать/закончить кон).
+
+    Атака - первая подходящая карта, защита - младшая карта той же масти,
+    иначе младший козырь, подкидывание - младшая подходящая карта.
+    """
+    hand = engine.hands[player_idx]
+    legal = engine.legal_mask(player_idx)
+    if not legal:
+        return None
+
+    if engine.game_phase == "attack":
+        return next(i for i, card in enumerate(hand) if CARD_BITS[card] & legal)
+
+    if engine.game_phase == "defense":
+        # Внутри масти биты идут по возрастанию ранга - младшая карта это младший бит
+        same_suit = legal & SUIT_MASKS[suit_of(CARD_INDEX[engine.field[-1]])]
+        choice = same_suit or legal & SUIT_MASKS[engine.trump_index]
+        return hand.index(CARD_KEYS[lowest(choice)])
+
+    candidates = legal & RANK_MASKS[lowest(rank_presence(legal))]
+    return next(i for i, card in enumerate(hand) if CARD_BITS[card] & candidates)
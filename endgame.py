@@ -0,0 +1,197 @@
+import collections
+import time
+from typing import Optional, Tuple
+
+from bitboard import CARD_INDEX, CARD_KEYS, FULL_DECK, NUM_CARDS, indices
+from durak_engine import DurakEngine
+from move_tables import TABLES
+
+# Точный перебор эндшпиля: когда колода кончилась, бот знает руку соперника
+# (все остальные карты видны), и партия становится игрой с полной информацией.
+# Альфа-бета по позициям из битовых масок, кэш позиций ограничен по размеру.
+
+PASS = NUM_CARDS
+PHASES = ("attack", "defense", "throw")
+ATTACK, DEFENSE, THROW = range(len(PHASES))
+EXACT, LOWER, UPPER = range(3)
+TIME_CHECK_INTERVAL = 1024  # Узлов между проверками дедлайна
+MAX_DEPTH = 150  # Глубже позиция считается ничьей, как партия с лимитом ходов
+DEPTH_STEPS = (10, 20, 40, 80, MAX_DEPTH)
+NO_ACTION = 63  # Лучшего хода нет - в упакованной записи кэша
+CACHE_ENTRIES = 200_000  # Около 35 МБ при полном кэше (замер tracemalloc)
+
+
+class SearchTimeout(Exception):
+    """Перебор не уложился в отведенное время"""
+
+
+class EndgameSolver:
+    """Альфа-бета с таблицей транспозиций.
+
+    Позиция - кортеж (рука 0, рука 1, стол, неотбитая карта, атакующий,
+    ходящий, фаза, козырь). Оценка всегда с точки зрения игрока 0:
+    1 - он выигрывает, -1 - проигрывает, 0 - ничья (позиция повторилась
+    или перебор дошел до предельной глубины). Кэш - LRU на max_entries
+    позиций, живет между вызовами. Позиция и запись в кэше упакованы в int
+    (pack_state(), pack_entry()) - запись занимает около 180 байт.
+    """
+
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.cache: collections.OrderedDict = collections.OrderedDict()
+        self.nodes = 0
+        self.deadline = 0.0
+        self.horizon_hits = 0  # Сколько раз перебор упирался в глубину
+
+    def solve(self, engine: DurakEngine, player_idx: int, time_budget: float) -> Tuple[bool, Optional[str]]:
+        """(решено, ключ карты или None - пас). Только для двоих и пустой колоды"""
+        if engine.deck or len(engine.hands) != 2:
+            return False, None
+        own = engine.hand_masks[player_idx]
+        # Все карты, кроме своих, стола и бито, - на руке у соперника
+        other = FULL_DECK & ~(own | engine.field_mask | engine.discard_mask)
+        hands = (own, other) if player_idx == 0 else (other, own)
+        phase = PHASES.index(engine.game_phase)
+        last = CARD_INDEX[engine.field[-1]] if phase == DEFENSE and len(engine.field) % 2 == 1 else -1
+        state = (hands[0], hands[1], engine.field_mask, last, engine.attacker_idx,
+                 engine.current_player_idx, phase, engine.trump_index)
+
+        self.nodes = 0
+        self.deadline = time.perf_counter() + time_budget
+        sign = 1 if player_idx == 0 else -1
+        actions = self.actions(state)
+        try:
+            # Итеративное углубление: выигрыш или проигрыш, найденный на малой глубине, уже точен
+            for depth in DEPTH_STEPS:
+                self.horizon_hits = 0
+                values = {}
+                for action in actions:
+                    child, winner = self.step(state, action)
+                    if winner is not None:
+                        values[action] = 1 if winner == player_idx else -1
+                    else:
+                        values[action] = sign * self.search(child, -1, 1, set(), depth)
+                    if values[action] == 1:
+                        break
+                best_action = max(values, key=values.get)
+                # Ничья без упора в глубину держится только на повторах - глубже искать незачем
+                if values[best_action] != 0 or not self.horizon_hits or depth == MAX_DEPTH:
+                    break
+                # Лучший ход прошлой итерации проверяем первым
+                actions.remove(best_action)
+                actions.insert(0, best_action)
+        except SearchTimeout:
+            return False, None
+        return True, None if best_action == PASS else CARD_KEYS[best_action]
+
+    def actions(self, state):
+        hands, field, last, phase = state[:2], state[2], state[3], state[6]
+        hand = hands[state[5]]
+        defending = last if phase == DEFENSE and last >= 0 else None
+        legal = TABLES[state[7]].legal_moves(PHASES[phase], hand, field, defending)
+        actions = list(indices(legal))
+        if phase != ATTACK:
+            actions.append(PASS)
+        return actions
+
+    def step(self, state, action):
+        """Позиция после хода и победитель (None - партия продолжается). Правила как в DurakEngine"""
+        hand_0, hand_1, field, last, attacker, current, phase, trump = state
+        hands = [hand_0, hand_1]
+        if action == PASS:
+            if phase == DEFENSE:
+                hands[current] |= field  # Защищающийся забирает стол
+            field, last = 0, -1
+            attacker = 1 - attacker
+            current, phase = attacker, ATTACK
+        else:
+            bit = 1 << action
+            hands[current] &= ~bit
+            field |= bit
+            if phase == ATTACK:
+                phase, current, last = DEFENSE, 1 - current, action
+            elif phase == DEFENSE:
+                if bin(field).count("1") % 2 == 0:
+                    phase, current, last = THROW, attacker, -1
+            else:
+                phase, current, last = DEFENSE, 1 - attacker, action
+        winner = 0 if not hands[0] else 1 if not hands[1] else None
+        return (hands[0], hands[1], field, last, attacker, current, phase, trump), winner
+
+    def search(self, state, alpha: int, beta: int, path: set, depth: int) -> int:
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_INTERVAL == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if state in path:
+            return 0  # Повтор позиции - ничья (оценка в кэше может зависеть от пути)
+        if depth == 0:
+            self.horizon_hits += 1
+            return 0
+
+        key = pack_state(state)
+        entry = self.cache.get(key)
+        first_action = None
+        if entry is not None:
+            self.cache.move_to_end(key)
+            value, flag, entry_depth, first_action = unpack_entry(entry)
+            # Победа или поражение точны на любой глубине, ничья - только если искали не мельче
+            usable = value != 0 or entry_depth >= depth
+            if usable and (flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha)):
+                return value
+
+        path.add(state)
+        horizon_hits = self.horizon_hits
+        original_alpha, original_beta = alpha, beta
+        maximizing = state[5] == 0
+        best, best_action = (-2 if maximizing else 2), None
+        actions = self.actions(state)
+        if first_action is not None:
+            # Сначала ход, который был лучшим при прошлом переборе этой позиции
+            actions.remove(first_action)
+            actions.insert(0, first_action)
+        for action in actions:
+            child, winner = self.step(state, action)
+            value = self.search(child, alpha, beta, path, depth - 1) if winner is None else (1 if winner == 0 else -1)
+            if maximizing and value > best or not maximizing and value < best:
+                best, best_action = value, action
+            if maximizing:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+        path.discard(state)
+
+        if best <= original_alpha:
+            flag = UPPER
+        elif best >= original_beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if self.horizon_hits == horizon_hits:
+            depth = MAX_DEPTH  # Оценка не зависит от глубины перебора
+        self.cache[key] = pack_entry(best, flag, depth, best_action)
+        if len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+        return best
+
+
+def pack_state(state) -> int:
+    """Позиция одним числом: три маски, неотбитая карта, атакующий, ходящий, фаза, козырь"""
+    hand_0, hand_1, field, last, attacker, current, phase, trump = state
+    key = (hand_0 << NUM_CARDS | hand_1) << NUM_CARDS | field
+    return (((key << 6 | last + 1) << 1 | attacker) << 1 | current) << 4 | phase << 2 | trump
+
+
+def pack_entry(value: int, flag: int, depth: int, action: Optional[int]) -> int:
+    return (((value + 1) << 2 | flag) << 8 | depth) << 6 | (NO_ACTION if action is None else action)
+
+
+def unpack_entry(entry: int):
+    """(оценка, флаг, глубина, лучший ход или None)"""
+    action = entry & 0x3F
+    return ((entry >> 16) & 0x3) - 1, (entry >> 14) & 0x3, (entry >> 6) & 0xFF, None if action == NO_ACTION else action
+
+
+# Один решатель на процесс: кэш переживает ходы и партии
+SOLVER = EndgameSolver()
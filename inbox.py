@@ -0,0 +1,88 @@
+import collections
+import itertools
+import time
+from typing import Dict, Iterator, Optional
+
+# Входящие сообщения сервера между потоком приема и окном игры. Пишет один
+# поток (NetworkManager.receive_messages), читает один (on_update), поэтому
+# хватает атомарных append/popleft у deque без блокировок.
+
+INBOX_CAPACITY = 4096  # Больше - самые старые сообщения вытесняются
+FRAME_BUDGET = 0.004  # Секунд на разбор сообщений за кадр
+
+# Какие сообщения устаревают с приходом нового: снимок списка лобби
+# перекрывает и прошлые снимки, и изменения к ним, состояние лобби - прошлое состояние.
+# Снимок стола так же перекрывает изменения стола до него
+SUPERSEDES = {
+    "lobbies_list": ("lobbies_list", "lobbies_delta"),
+    "game_state": ("game_state", "game_delta"),
+    "lobby_update": ("lobby_update",),
+}
+
+
+class Inbox:
+    """Ограниченная очередь сообщений с выбрасыванием устаревших.
+
+    Каждое сообщение получает номер. Когда приходит сообщение из SUPERSEDES,
+    для перекрытых видов запоминается его номер, и более ранние сообщения
+    этих видов пропускаются при чтении - без поиска по очереди. Если очередь
+    переполнилась, самое старое сообщение теряется. Потерю замечает читатель
+    по пропуску в номерах, а take_overflow() говорит клиенту, что состояние
+    надо запросить у сервера заново.
+    """
+
+    def __init__(self, capacity: int = INBOX_CAPACITY):
+        self.queue: collections.deque = collections.deque(maxlen=capacity)
+        self.counter = itertools.count()
+        self.cutoff: Dict[str, int] = {}  # вид сообщения -> номер, раньше которого оно устарело
+        self.high_water = 0  # Наибольшая длина очереди
+        self.next_seq = 0  # Номер, который читатель ждет следующим
+        self.dropped = 0  # Потеряно при переполнении, считает читатель
+        self.reported = 0  # Сколько потерь уже видел читатель
+        self.coalesced = 0  # Пропущено как устаревшие
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def put(self, message: Dict):
+        """Вызывается из потока приема"""
+        seq = next(self.counter)
+        action = message.get("action")
+        # Следующие страницы списка лобби дополняют снимок, а не заменяют его
+        kinds = SUPERSEDES.get(action, ()) if not message.get("offset") else ()
+        for kind in kinds:
+            self.cutoff[kind] = seq
+        self.queue.append((seq, action, message))
+        self.high_water = max(self.high_water, len(self.queue))
+
+    def get(self) -> Optional[Dict]:
+        """Следующее актуальное сообщение или None"""
+        while True:
+            try:
+                seq, action, message = self.queue.popleft()
+            except IndexError:
+                return None
+            # Номера идут подряд: пропуск - это сообщения, вытесненные при переполнении
+            self.dropped += seq - self.next_seq
+            self.next_seq = seq + 1
+            if seq < self.cutoff.get(action, -1):
+                self.coalesced += 1
+                continue
+            return message
+
+    def drain(self, budget: float = FRAME_BUDGET) -> Iterator[Dict]:
+        """Сообщения, пока не кончится время кадра. Хотя бы одно - если есть"""
+        deadline = time.perf_counter() + budget
+        while True:
+            message = self.get()
+            if message is None:
+                return
+            yield message
+            if time.perf_counter() >= deadline:
+                return
+
+    def take_overflow(self) -> bool:
+        """Было ли переполнение с прошлой проверки"""
+        dropped = self.dropped
+        overflowed, self.reported = dropped != self.reported, dropped
+        return overflowed
@@ -0,0 +1,162 @@
+import math
+import random
+import time
+from typing import Dict, List, Optional
+
+from bitboard import CARD_BITS, CARD_KEYS, FULL_DECK, NUM_CARDS, indices, mask_of
+from durak_engine import DurakEngine, greedy_move
+from endgame import SOLVER
+
+# Бот на ISMCTS (поиск Монте-Карло по информационным множествам).
+# Каждая итерация перебирает ходы на своей детерминизации - случайной
+# раскладке скрытых карт, совместимой с тем, что бот видел. Дерево общее
+# для всех раскладок, ходы в узлах - индексы карт (0..35) или PASS.
+# Когда колода пуста, сначала пробуем точный перебор (endgame.py).
+
+PASS = NUM_CARDS
+EXPLORATION = 0.7
+ROLLOUT_MOVE_LIMIT = 200  # Партия без победителя дальше считается ничьей
+ROLLOUT_RANDOMNESS = 0.2  # Доля случайных ходов в доигровке вместо жадных
+ENDGAME_SHARE = 0.5  # Часть времени хода на точный перебор эндшпиля
+
+# Время на ход по уровню сложности, секунды
+BOT_TIME_BUDGETS = {"easy": 0.05, "normal": 0.2, "hard": 1.0}
+
+
+def determinize(engine: DurakEngine, observer: int, rng: random.Random) -> DurakEngine:
+    """Копия партии, где чужие руки и колода случайно разложены из неизвестных observer карт.
+
+    Известны: своя рука, стол, бито и карты, которые соперники забрали со стола.
+    """
+    sim = engine.copy()
+    seen = sim.hand_masks[observer] | sim.field_mask | sim.discard_mask
+    for i, public in enumerate(sim.public_masks):
+        if i != observer:
+            seen |= public
+    unknown = [CARD_KEYS[i] for i in indices(FULL_DECK & ~seen)]
+    rng.shuffle(unknown)
+
+    for i, hand in enumerate(sim.hands):
+        if i == observer:
+            continue
+        known = [card for card in hand if CARD_BITS[card] & sim.public_masks[i]]
+        need = len(hand) - len(known)
+        sim.hands[i] = known + unknown[:need]
+        sim.hand_masks[i] = mask_of(sim.hands[i])
+        del unknown[:need]
+    sim.deck = unknown
+    return sim
+
+
+def legal_actions(engine: DurakEngine) -> List[int]:
+    player = engine.current_player_idx
+    actions = list(indices(engine.legal_mask(player)))
+    if engine.game_phase != "attack":
+        actions.append(PASS)  # Забрать карты / закончить кон
+    return actions
+
+
+def apply_action(engine: DurakEngine, action: int) -> bool:
+    player = engine.current_player_idx
+    if action == PASS:
+        ok = engine.pass_move(player)
+    else:
+        ok = engine.play_card(player, CARD_KEYS[action])
+    engine.check_game_over()
+    return ok
+
+
+class Node:
+    """Узел дерева: ход action, сделанный игроком player"""
+
+    __slots__ = ("parent", "action", "player", "children", "visits", "wins", "avails")
+
+    def __init__(self, parent: Optional['Node'] = None, action: Optional[int] = None,
+                 player: Optional[int] = None):
+        self.parent = parent
+        self.action = action
+        self.player = player
+        self.children: Dict[int, Node] = {}
+        self.visits = 0
+        self.wins = 0.0
+        self.avails = 1
+
+    def select(self, actions: List[int]) -> 'Node':
+        # UCB с учетом того, сколько раз ход вообще был доступен
+        best, best_score = None, -1.0
+        for action in actions:
+            child = self.children[action]
+            child.avails += 1
+            score = child.wins / child.visits + EXPLORATION * math.sqrt(math.log(child.avails) / child.visits)
+            if score > best_score:
+                best, best_score = child, score
+        return best
+
+
+def rollout(engine: DurakEngine, rng: random.Random) -> Optional[int]:
+    """Доигровка почти жадной стратегией, возвращает победителя (None - ничья)"""
+    for _ in range(ROLLOUT_MOVE_LIMIT):
+        if engine.winner is not None:
+            break
+        player = engine.current_player_idx
+        if rng.random() < ROLLOUT_RANDOMNESS:
+            action = rng.choice(legal_actions(engine))
+            apply_action(engine, action)
+            continue
+        card_idx = greedy_move(engine, player)
+        if card_idx is None:
+            engine.pass_move(player)
+        else:
+            engine.make_move(player, card_idx)
+        engine.check_game_over()
+    return engine.winner
+
+
+def choose_move(engine: DurakEngine, player_idx: int, time_budget: float,
+                seed: Optional[int] = None) -> Optional[str]:
+    """Ход бота: ключ карты или None - пас. Ищет не дольше time_budget секунд"""
+    rng = random.Random(seed)
+    root_actions = legal_actions(engine)
+    if len(root_actions) == 1:
+        return None if root_actions[0] == PASS else CARD_KEYS[root_actions[0]]
+
+    started = time.perf_counter()
+    if not engine.deck:
+        solved, key = SOLVER.solve(engine, player_idx, time_budget * ENDGAME_SHARE)
+        if solved:
+            return key
+
+    root = Node()
+    deadline = started + time_budget
+    while time.perf_counter() < deadline:
+        sim = determinize(engine, player_idx, rng)
+        node = root
+
+        # Спуск по дереву, пока все ходы раскладки уже раскрыты
+        while sim.winner is None:
+            actions = legal_actions(sim)
+            untried = [action for action in actions if action not in node.children]
+            if untried:
+                action = rng.choice(untried)
+                child = Node(node, action, sim.current_player_idx)
+                node.children[action] = child
+                apply_action(sim, action)
+                node = child
+                break
+            node = node.select(actions)
+            apply_action(sim, node.action)
+
+        winner = rollout(sim, rng)
+
+        while node is not None:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.player:
+                node.wins += 1
+            node = node.parent
+
+    if not root.children:
+        return None if root_actions[0] == PASS else CARD_KEYS[root_actions[0]]
+    best = max(root.children.values(), key=lambda child: child.visits)
+    return None if best.action == PASS else CARD_KEYS[best.action]
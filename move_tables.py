@@ -0,0 +1,56 @@
+from typing import List, Optional
+
+from bitboard import NUM_CARDS, NUM_RANKS, RANK_ROW, SUIT_MASKS, SUITS, rank_of, rank_presence, suit_of
+
+# Таблицы ходов строятся один раз при импорте: на каждый козырь - матрица
+# "карта бьет карту" 36x36 и маски бьющих карт, плюс общая для всех козырей
+# таблица подкидывания по набору рангов на столе.
+
+# THROW_MASKS[ранги] - все карты рангов из 9-битной маски (512 вариантов)
+THROW_MASKS = [ranks | ranks << 9 | ranks << 18 | ranks << 27 for ranks in range(1 << NUM_RANKS)]
+
+
+def _beats_mask(index: int, trump: int) -> int:
+    suit, rank = suit_of(index), rank_of(index)
+    # Старшие карты той же масти
+    higher = (RANK_ROW & ~((1 << (rank + 1)) - 1)) << (suit * NUM_RANKS)
+    if suit != trump:
+        higher |= SUIT_MASKS[trump]
+    return higher
+
+
+class MoveTables:
+    """Таблицы для одного козыря"""
+
+    def __init__(self, trump: int):
+        self.trump = trump
+        # beats[карта] - маска карт, которые ее бьют
+        self.beats: List[int] = [_beats_mask(i, trump) for i in range(NUM_CARDS)]
+        # beat_matrix[атакующая * 36 + защищающаяся] == 1, если защита бьет атаку
+        self.beat_matrix = bytes(
+            (self.beats[attack] >> defend) & 1
+            for attack in range(NUM_CARDS) for defend in range(NUM_CARDS)
+        )
+
+    def can_beat(self, attacking_card: int, defending_card: int) -> bool:
+        return self.beat_matrix[attacking_card * NUM_CARDS + defending_card] == 1
+
+    def legal_moves(self, phase: str, hand: int, field: int, last_card: Optional[int]) -> int:
+        """Маска карт из hand, которыми можно сходить.
+
+        last_card - индекс неотбитой карты на столе (для фазы защиты).
+        """
+        if phase == "attack":
+            return hand & THROW_MASKS[rank_presence(field)] if field else hand
+        elif phase == "defense":
+            return hand & self.beats[last_card] if last_card is not None else 0
+        elif phase == "throw":
+            return hand & THROW_MASKS[rank_presence(field)]
+        return 0
+
+
+TABLES = [MoveTables(trump) for trump in range(len(SUITS))]
+
+
+def tables_for(trump_suit: str) -> MoveTables:
+    return TABLES[SUITS.index(trump_suit)]
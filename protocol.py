@@ -0,0 +1,458 @@
+import json
+import struct
+from typing import Dict, List, Optional
+
+from bitboard import CARD_INDEX, CARD_KEYS, SUITS
+
+# Формат кадра: 4 байта длины (big-endian) + тело сообщения.
+# Тело - JSON или двоичное сообщение (первый байт BINARY_MAGIC, с него не
+# начинается ни один JSON). Разборщик понимает оба, а формат отправки
+# стороны выбирают сообщением hello: клиент перечисляет форматы, сервер
+# отвечает выбранным. Старый сервер отвечает ошибкой - остается JSON.
+HEADER = struct.Struct("!I")
+RECV_BUFFER_SIZE = 65536
+MAX_MESSAGE_SIZE = 4 * 1024 * 1024
+
+FORMAT_JSON = "json"
+FORMAT_BINARY = "binary2"  # Номер меняется вместе с таблицами ниже
+FORMATS = (FORMAT_BINARY, FORMAT_JSON)  # В порядке предпочтения
+
+# Двоичное сообщение: BINARY_MAGIC, код типа (индекс action в OPCODES,
+# 0 - action нет или он не из таблицы), затем словарь остальных полей.
+# Значение - байт-тег и данные:
+#   TAG_CARD + байт: карта как индекс в CARD_KEYS (масть * 9 + ранг)
+#   TAG_CARDS + varint длины + байты: список карт (рука, стол)
+#   CONST_BASE + i: строка CONSTANTS[i] - имена полей, фазы, масти
+#   SMALL_INT_BASE + n: целое 0..63 (номера игроков, размеры рук)
+#   TAG_INT + zigzag varint: остальные целые
+#   TAG_STR + varint длины + UTF-8: новая строка, она же попадает в таблицу
+#   сообщения, и повтор (имя игрока в списке лобби) - TAG_REF + varint номера
+#   TAG_TABLE: список словарей с одинаковыми ключами (лобби) - ключи один раз, дальше значения
+# Таблицы только дописываются в конец, иначе старые клиенты прочитают чужие значения.
+BINARY_MAGIC = 0xB1
+OPCODES = [
+    None, "game_state", "game_action", "game_start", "lobby_update", "lobbies_list", "lobbies_delta",
+    "hello", "set_name", "create_lobby", "join_lobby", "leave_lobby", "start_game", "list_lobbies",
+    "unsubscribe_lobbies", "left_lobby", "success", "game_delta", "game_resync",
+]
+CONSTANTS = [
+    "action", "status", "message", "success", "error", "type", "play", "pass",
+    "hand", "hand_sizes", "field", "deck_size", "trump_suit", "game_phase", "current_player_idx",
+    "attacker_idx", "winner", "last_move", "player_idx", "card", "attack", "defense", "throw",
+    "players", "id", "name", "is_you", "forced_start", "your_index", "state",
+    "lobby", "lobbies", "version", "offset", "total", "subscribed", "your_lobby",
+    "added", "changed", "removed", "player_count", "max_players", "game_started", "has_password",
+    "creator", "can_join", "worker", "lobby_id", "password", "player_name", "limit",
+    "joinable_only", "subscribe", "formats", "format", FORMAT_JSON, FORMAT_BINARY,
+] + SUITS + ["seq", "hand_add", "hand_remove", "field_add"]
+(TAG_NONE, TAG_FALSE, TAG_TRUE, TAG_INT, TAG_FLOAT, TAG_STR, TAG_REF, TAG_LIST, TAG_DICT, TAG_CARD, TAG_CARDS,
+ TAG_TABLE) = range(12)
+CONST_BASE = 0x40
+SMALL_INT_BASE = 0xC0
+SMALL_INTS = 0x100 - SMALL_INT_BASE
+DOUBLE = struct.Struct("!d")
+# Раскладки game_state и game_action: карта - байт индекса, NONE_BYTE - None,
+# NO_FIELD - поля card в ходе нет (пас)
+PACKED = 0x80
+NONE_BYTE = 0xFF
+NO_FIELD = 0xFE
+MAX_VARINT_SHIFT = 63  # varint длиннее 64 бит - битое сообщение
+MIN_INT, MAX_INT = -2 ** 63, 2 ** 63 - 1  # Целые, которые влезают в 64-битный zigzag varint
+PHASES = ("attack", "defense", "throw")
+MOVE_TYPES = ("play", "pass")
+STATE_HEADER = struct.Struct("!6B")  # козырь, фаза, ходящий, атакующий, победитель, колода; дальше varint seq
+GAME_STATE_KEYS = {"action", "seq", "hand", "hand_sizes", "field", "deck_size", "trump_suit", "game_phase",
+                   "current_player_idx", "attacker_idx", "winner", "last_move"}
+LAST_MOVE_KEYS = {"player_idx", "type", "card"}
+GAME_ACTION_KEYS = {"action", "type", "card"}
+
+OPCODE_INDEX = {action: i for i, action in enumerate(OPCODES) if action}
+CONST_INDEX = {value: i for i, value in enumerate(CONSTANTS)}
+assert len(CONSTANTS) <= SMALL_INT_BASE - CONST_BASE
+# Готовые байты для самых частых значений
+CARD_CODES = {key: bytes((TAG_CARD, i)) for i, key in enumerate(CARD_KEYS)}
+
+
+class ProtocolError(Exception):
+    """Нарушение формата кадров - дальше читать поток нельзя"""
+
+
+def encode_frame(payload: bytes) -> bytes:
+    return HEADER.pack(len(payload)) + payload
+
+
+def encode_message(message: Dict, binary: bool = False) -> bytes:
+    """Упаковка сообщения в кадр с префиксом длины"""
+    if binary:
+        try:
+            return encode_frame(encode_binary(message))
+        except ValueError:
+            pass  # Значение вне двоичного формата (например, огромное целое) - кадр уйдет в JSON
+    return encode_frame(json.dumps(message).encode())
+
+
+def decode_message(frame: bytes) -> Dict:
+    """Разбор тела одного кадра любого формата (бросает ValueError при битом сообщении)"""
+    if frame[:1] == b"\xb1":
+        return decode_binary(frame)
+    return json.loads(frame)
+
+
+def choose_format(offered) -> str:
+    """Лучший из предложенных форматов, который мы понимаем"""
+    if isinstance(offered, list):
+        for wire_format in FORMATS:
+            if wire_format in offered:
+                return wire_format
+    return FORMAT_JSON
+
+
+def write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data: bytes, pos: int):
+    """(значение, позиция после него)"""
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+        if shift > MAX_VARINT_SHIFT:
+            raise ValueError("varint too long")
+
+
+def encode_value(value, out: bytearray, strings: Dict[str, int]):
+    """Значение в out. strings - уже записанные в этом сообщении строки"""
+    if isinstance(value, str):
+        card = CARD_CODES.get(value)
+        if card is not None:
+            out += card
+            return
+        const = CONST_INDEX.get(value)
+        if const is not None:
+            out.append(CONST_BASE + const)
+            return
+        ref = strings.get(value)
+        if ref is not None:
+            out.append(TAG_REF)
+            write_varint(out, ref)
+            return
+        strings[value] = len(strings)
+        data = value.encode()
+        out.append(TAG_STR)
+        write_varint(out, len(data))
+        out += data
+    elif value is None:
+        out.append(TAG_NONE)
+    elif value is True:
+        out.append(TAG_TRUE)
+    elif value is False:
+        out.append(TAG_FALSE)
+    elif isinstance(value, int):
+        if not MIN_INT <= value <= MAX_INT:
+            raise ValueError(f"Int {value} does not fit in a varint")
+        if 0 <= value < SMALL_INTS:
+            out.append(SMALL_INT_BASE + value)
+        else:
+            out.append(TAG_INT)
+            write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+    elif isinstance(value, dict):
+        out.append(TAG_DICT)
+        write_varint(out, len(value))
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise TypeError(f"Dict keys must be str, not {type(key).__name__}")
+            encode_value(key, out, strings)
+            encode_value(item, out, strings)
+    elif isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, str) and item in CARD_INDEX for item in value):
+            out.append(TAG_CARDS)
+            write_varint(out, len(value))
+            out += bytes(CARD_INDEX[item] for item in value)
+            return
+        first = value[0] if value else None
+        if type(first) is dict and len(value) > 1:
+            keys = list(first)
+            if keys and all(type(item) is dict and list(item) == keys for item in value):
+                out.append(TAG_TABLE)
+                write_varint(out, len(value))
+                write_varint(out, len(keys))
+                for key in keys:
+                    encode_value(key, out, strings)
+                for item in value:
+                    for field in item.values():
+                        encode_value(field, out, strings)
+                return
+        out.append(TAG_LIST)
+        write_varint(out, len(value))
+        for item in value:
+            encode_value(item, out, strings)
+    elif isinstance(value, float):
+        out.append(TAG_FLOAT)
+        out += DOUBLE.pack(value)
+    else:
+        raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def pack_game_state(message: Dict, out: bytearray) -> bool:
+    """Состояние стола фиксированной раскладкой. False - сообщение не подходит под нее"""
+    if message.keys() != GAME_STATE_KEYS:
+        return False
+    winner = message["winner"]
+    if winner is not None and not 0 <= winner < NONE_BYTE:
+        return False
+    out += STATE_HEADER.pack(SUITS.index(message["trump_suit"]), PHASES.index(message["game_phase"]),
+                             message["current_player_idx"], message["attacker_idx"],
+                             NONE_BYTE if winner is None else winner, message["deck_size"])
+    seq = message["seq"]
+    if not isinstance(seq, int) or seq < 0:
+        return False
+    write_varint(out, seq)
+    for cards in (message["hand"], message["field"]):
+        out.append(len(cards))
+        out += bytes(CARD_INDEX[card] for card in cards)
+    sizes = message["hand_sizes"]
+    out.append(len(sizes))
+    out += bytes(sizes)
+    last_move = message["last_move"]
+    if last_move is None:
+        out.append(NONE_BYTE)
+        return True
+    return pack_move(last_move, out, LAST_MOVE_KEYS)
+
+
+def pack_move(move: Dict, out: bytearray, keys) -> bool:
+    """Ход: номер игрока (если есть), тип, карта. Пас может прийти без поля card"""
+    if move.keys() != keys and move.keys() != keys - {"card"}:
+        return False
+    if "player_idx" in keys:
+        if not 0 <= move["player_idx"] < NONE_BYTE:
+            return False
+        out.append(move["player_idx"])
+    out.append(MOVE_TYPES.index(move["type"]))
+    if "card" not in move:
+        out.append(NO_FIELD)
+    elif move["card"] is None:
+        out.append(NONE_BYTE)
+    else:
+        out.append(CARD_INDEX[move["card"]])
+    return True
+
+
+def pack_game_action(message: Dict, out: bytearray) -> bool:
+    return pack_move(message, out, GAME_ACTION_KEYS)
+
+
+def unpack_move(data: bytes, pos: int, move: Dict) -> Dict:
+    move["type"] = MOVE_TYPES[data[pos]]
+    card = data[pos + 1]
+    if card != NO_FIELD:
+        move["card"] = None if card == NONE_BYTE else CARD_KEYS[card]
+    return move
+
+
+def unpack_game_state(data: bytes) -> Dict:
+    trump, phase, current, attacker, winner, deck_size = STATE_HEADER.unpack_from(data, 2)
+    seq, pos = read_varint(data, 2 + STATE_HEADER.size)
+    parts = []
+    for _ in range(3):
+        count = data[pos]
+        pos += 1 + count
+        parts.append(data[pos - count:pos])
+    hand, field, sizes = parts
+    if data[pos] == NONE_BYTE:
+        last_move, pos = None, pos + 1
+    else:
+        last_move, pos = unpack_move(data, pos + 1, {"player_idx": data[pos]}), pos + 3
+    if pos != len(data):
+        raise ValueError("Malformed game_state")
+    return {
+        "action": "game_state",
+        "seq": seq,
+        "hand": [CARD_KEYS[i] for i in hand],
+        "hand_sizes": list(sizes),
+        "field": [CARD_KEYS[i] for i in field],
+        "deck_size": deck_size,
+        "trump_suit": SUITS[trump],
+        "game_phase": PHASES[phase],
+        "current_player_idx": current,
+        "attacker_idx": attacker,
+        "winner": None if winner == NONE_BYTE else winner,
+        "last_move": last_move,
+    }
+
+
+def unpack_game_action(data: bytes) -> Dict:
+    if len(data) != 4:
+        raise ValueError("Malformed game_action")
+    return unpack_move(data, 2, {"action": "game_action"})
+
+
+# Самые частые сообщения - без тегов, фиксированной раскладкой (код типа | PACKED)
+PACKERS = {"game_state": pack_game_state, "game_action": pack_game_action}
+UNPACKERS = {OPCODE_INDEX["game_state"]: unpack_game_state, OPCODE_INDEX["game_action"]: unpack_game_action}
+
+
+def encode_binary(message: Dict) -> bytes:
+    action = message.get("action")
+    opcode = OPCODE_INDEX.get(action, 0)
+    packer = PACKERS.get(action)
+    if packer is not None:
+        out = bytearray((BINARY_MAGIC, PACKED | opcode))
+        try:
+            if packer(message, out):
+                return bytes(out)
+        except (KeyError, ValueError, TypeError, struct.error):
+            pass  # Значения не влезают в раскладку - общий формат
+    out = bytearray((BINARY_MAGIC, opcode))
+    strings: Dict[str, int] = {}
+    if opcode:
+        # action уже в коде типа
+        out.append(TAG_DICT)
+        write_varint(out, len(message) - 1)
+        for key, value in message.items():
+            if key != "action":
+                encode_value(key, out, strings)
+                encode_value(value, out, strings)
+    else:
+        encode_value(message, out, strings)
+    return bytes(out)
+
+
+def decode_value(data: bytes, pos: int):
+    """Значение с позиции pos: (значение, позиция после него)"""
+    strings: List[str] = []
+    end = len(data)
+
+    def varint() -> int:
+        nonlocal pos
+        result, pos = read_varint(data, pos)
+        return result
+
+    def count(per_item: int = 1) -> int:
+        # Каждый элемент занимает хотя бы байт: длина, которой не хватит
+        # данных кадра, отвергается до того, как под нее что-то создано
+        items = varint()
+        if items * per_item > end - pos:
+            raise ValueError("count past the end")
+        return items
+
+    def chunk() -> bytes:
+        nonlocal pos
+        length = varint()
+        start, pos = pos, pos + length
+        if pos > end:
+            raise IndexError("value past the end")
+        return data[start:pos]
+
+    def value():
+        nonlocal pos
+        tag = data[pos]
+        pos += 1
+        if tag >= SMALL_INT_BASE:
+            return tag - SMALL_INT_BASE
+        if tag >= CONST_BASE:
+            return CONSTANTS[tag - CONST_BASE]
+        if tag == TAG_CARD:
+            pos += 1
+            return CARD_KEYS[data[pos - 1]]
+        if tag == TAG_DICT:
+            return {value(): value() for _ in range(count(2))}
+        if tag == TAG_STR:
+            text = chunk().decode()
+            strings.append(text)
+            return text
+        if tag == TAG_REF:
+            return strings[varint()]
+        if tag == TAG_CARDS:
+            return [CARD_KEYS[i] for i in chunk()]
+        if tag == TAG_NONE:
+            return None
+        if tag == TAG_TRUE:
+            return True
+        if tag == TAG_FALSE:
+            return False
+        if tag == TAG_LIST:
+            return [value() for _ in range(count())]
+        if tag == TAG_TABLE:
+            rows = varint()
+            keys = [value() for _ in range(count())]
+            if not keys or rows * len(keys) > end - pos:
+                raise ValueError("Malformed table")
+            return [{key: value() for key in keys} for _ in range(rows)]
+        if tag == TAG_INT:
+            zigzag = varint()
+            return zigzag >> 1 if not zigzag & 1 else -((zigzag + 1) >> 1)
+        if tag == TAG_FLOAT:
+            pos += DOUBLE.size
+            return DOUBLE.unpack_from(data, pos - DOUBLE.size)[0]
+        raise ValueError(f"Unknown tag {tag}")
+
+    return value(), pos
+
+
+def decode_binary(frame: bytes) -> Dict:
+    try:
+        opcode = frame[1]
+        if opcode & PACKED:
+            unpack = UNPACKERS.get(opcode & ~PACKED)
+            if unpack is None:
+                raise ValueError(f"Unknown packed opcode {opcode}")
+            return unpack(frame)
+        fields, pos = decode_value(frame, 2)
+        if pos != len(frame) or not isinstance(fields, dict) or opcode >= len(OPCODES):
+            raise ValueError("Malformed binary message")
+    except (IndexError, UnicodeDecodeError, struct.error, TypeError, RecursionError) as e:
+        raise ValueError(f"Malformed binary message: {e}") from e
+    if not opcode:
+        return fields
+    message = {"action": OPCODES[opcode]}
+    message.update(fields)
+    return message
+
+
+class MessageDecoder:
+    """Потоковый разборщик кадров.
+
+    Данные из сокета копятся в одном буфере, за один вызов feed()
+    извлекаются все целые кадры, а хвост ждет следующего чтения.
+    """
+
+    def __init__(self, max_message_size: int = MAX_MESSAGE_SIZE):
+        self.max_message_size = max_message_size
+        self.buffer = bytearray()
+        # Переиспользуемый буфер приема, чтобы не создавать bytes на каждый recv
+        self.recv_buffer = bytearray(RECV_BUFFER_SIZE)
+        self.recv_view = memoryview(self.recv_buffer)
+
+    def feed(self, data) -> List[bytes]:
+        self.buffer += data
+        frames = []
+        offset = 0
+        available = len(self.buffer)
+        while available - offset >= HEADER.size:
+            (length,) = HEADER.unpack_from(self.buffer, offset)
+            if length > self.max_message_size:
+                raise ProtocolError(f"Message too large: {length} bytes")
+            end = offset + HEADER.size + length
+            if end > available:
+                break
+            frames.append(bytes(self.buffer[offset + HEADER.size:end]))
+            offset = end
+        if offset:
+            del self.buffer[:offset]
+        return frames
+
+    def recv_from(self, sock) -> Optional[List[bytes]]:
+        """Одно чтение из сокета. None - соединение закрыто"""
+        received = sock.recv_into(self.recv_buffer)
+        if not received:
+            return None
+        return self.feed(self.recv_view[:received])
@@ -1,38 +1,64 @@
+import abc
+import argparse
+import asyncio
+import base64
+import collections
+import itertools
+import json
+import multiprocessing
+import os
 import socket
 import threading
-import json
-import random
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Set
 import time
 
+from durak_engine import DurakEngine, state_delta
+from protocol import (FORMAT_BINARY, MessageDecoder, ProtocolError, choose_format, decode_message, encode_frame,
+                      encode_message)
+
 # Настройки сервера
 SERVER_HOST = "127.0.0.1"
 SERVER_PORT = 5555
-BUFFER_SIZE = 4096
 MAX_LOBBIES = 10
 MAX_PLAYERS_PER_LOBBY = 2
+LISTEN_BACKLOG = 1024
+MAX_WRITE_BUFFER = 1024 * 1024  # байт неотправленных данных на одного клиента
+MAX_LINK_MESSAGE = 64 * 1024  # максимальный размер сообщения между воркерами
+LOBBY_PAGE_SIZE = 50  # лобби на одной странице списка по умолчанию
+MAX_LOBBY_PAGE_SIZE = 500
+
+# Какие сообщения в очереди отправки устаревают с приходом нового: состояние
+# лобби - прошлое состояние, снимок стола - прошлые снимки и изменения стола
+OUTBOX_SUPERSEDES = {
+    "lobby_update": ("lobby_update",),
+    "game_state": ("game_state", "game_delta"),
+}
 
 class Lobby:
-    def __init__(self, lobby_id: str, name: str, creator: 'ClientHandler'):
+    def __init__(self, lobby_id: str, name: str, creator: 'ClientSession'):
         self.id = lobby_id
         self.name = name
-        self.players: List['ClientHandler'] = [creator]
+        self.players: List['ClientSession'] = [creator]
         self.creator = creator
         self.game_started = False
         self.max_players = MAX_PLAYERS_PER_LOBBY
         self.password = None
+        self.engine: Optional[DurakEngine] = None  # партия ведется на сервере
+        
+    def is_joinable(self) -> bool:
+        return not self.game_started and len(self.players) < self.max_players
         
-    def add_player(self, player: 'ClientHandler') -> bool:
+    def add_player(self, player: 'ClientSession') -> bool:
         if len(self.players) < self.max_players and not self.game_started:
             self.players.append(player)
             return True
         return False
         
-    def remove_player(self, player: 'ClientHandler'):
+    def remove_player(self, player: 'ClientSession'):
         if player in self.players:
             self.players.remove(player)
-            if not self.players and self in server.lobbies:
-                server.remove_lobby(self)
+            if not self.players:
+                player.server.remove_lobby(self)
                 
     def get_info(self) -> Dict:
         return {
@@ -46,33 +72,171 @@ class Lobby:
             "creator": self.creator.player_name if self.creator else None  # Добавляем создателя
         }
 
-class ClientHandler(threading.Thread):
-    def __init__(self, conn, addr, server):
-        super().__init__()
-        self.conn = conn
+class LobbyRegistry:
+    """Реестр лобби этого процесса: поиск по id за O(1) и выдача id.
+
+    Открытые лобби для списка индексирует LobbyListing - там видны и лобби
+    других воркеров.
+    """
+
+    def __init__(self, id_prefix: str = "lobby", max_lobbies: int = MAX_LOBBIES):
+        self.id_prefix = id_prefix
+        self.max_lobbies = max_lobbies
+        self.by_id: Dict[str, Lobby] = {}
+        self.next_id = 1
+        
+    def __len__(self) -> int:
+        return len(self.by_id)
+        
+    def __iter__(self) -> Iterator[Lobby]:
+        return iter(self.by_id.values())
+        
+    def is_full(self) -> bool:
+        return len(self.by_id) >= self.max_lobbies
+        
+    def new_id(self) -> str:
+        # Монотонный счетчик: id не повторяются и не требуют проверки коллизий
+        lobby_id = f"{self.id_prefix}{self.next_id}"
+        self.next_id += 1
+        return lobby_id
+        
+    def get(self, lobby_id: str) -> Optional[Lobby]:
+        return self.by_id.get(lobby_id)
+        
+    def add(self, lobby: Lobby):
+        self.by_id[lobby.id] = lobby
+        
+    def remove(self, lobby: Lobby) -> bool:
+        if self.by_id.get(lobby.id) is not lobby:
+            return False
+        del self.by_id[lobby.id]
+        return True
+
+class LobbyListing:
+    """Кэш списка лобби для браузера.
+
+    Хранит готовые словари get_info() (плюс can_join) в порядке создания
+    и индекс joinable - лобби с can_join в порядке, в котором они открылись,
+    чтобы страницы joinable_only не перебирали весь список. Отдает их страницами и рассылает подписчикам только изменения.
+    Изменения копятся в pending и уходят одним сообщением при flush(),
+    который вызывается после обработки каждого сообщения клиента. Сообщение
+    встает в очередь отправки подписчика (ClientSession.queue_frame).
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, Dict] = {}
+        self.joinable: Dict[str, Dict] = {}
+        self.version = 0
+        self.subscribers: Set['ClientSession'] = set()
+        self.pending: Dict[str, tuple] = {}  # id -> ("added" | "changed" | "removed", info)
+        self.lock = threading.Lock()  # в режиме threaded список меняют разные потоки
+        
+    def update(self, info: Dict):
+        with self.lock:
+            lobby_id = info["id"]
+            previous = self.pending.get(lobby_id)
+            if lobby_id not in self.entries or (previous and previous[0] == "added"):
+                kind = "added"
+            else:
+                kind = "changed"
+            self.entries[lobby_id] = info
+            if info["can_join"]:
+                self.joinable[lobby_id] = info
+            else:
+                self.joinable.pop(lobby_id, None)
+            self.pending[lobby_id] = (kind, info)
+            
+    def remove(self, lobby_id: str):
+        with self.lock:
+            if self.entries.pop(lobby_id, None) is None:
+                return
+            self.joinable.pop(lobby_id, None)
+            previous = self.pending.get(lobby_id)
+            if previous and previous[0] == "added":
+                # Подписчики это лобби еще не видели
+                del self.pending[lobby_id]
+            else:
+                self.pending[lobby_id] = ("removed", None)
+                
+    def page(self, offset: int, limit: int, joinable_only: bool = False):
+        entries = self.joinable if joinable_only else self.entries
+        lobbies = list(itertools.islice(entries.values(), offset, offset + limit))
+        return lobbies, len(entries), self.version
+        
+    def snapshot(self, client: 'ClientSession', offset: int, limit: int,
+                 joinable_only: bool = False, subscribe: bool = False):
+        # Страница и подписка под одной блокировкой, чтобы не потерять изменения между ними
+        with self.lock:
+            if subscribe:
+                self.subscribers.add(client)
+            return self.page(offset, limit, joinable_only)
+            
+    def unsubscribe(self, client: 'ClientSession'):
+        with self.lock:
+            self.subscribers.discard(client)
+            
+    def flush(self):
+        if not self.pending:
+            return
+        with self.lock:
+            self.version += 1
+            delta = {"action": "lobbies_delta", "version": self.version,
+                     "added": [], "changed": [], "removed": []}
+            for lobby_id, (kind, info) in self.pending.items():
+                delta[kind].append(lobby_id if kind == "removed" else info)
+            self.pending.clear()
+            subscribers = list(self.subscribers)
+            
+        # Сериализуем один раз на каждый формат, а не на каждого подписчика
+        encoded = {}
+        for client in subscribers:
+            if client.binary not in encoded:
+                encoded[client.binary] = encode_message(delta, client.binary)
+            client.queue_frame(delta["action"], encoded[client.binary])
+
+class ClientSession(abc.ABC):
+    """Логика одного клиента, общая для всех режимов сервера.
+
+    Наследники отвечают только за транспорт: write() и close_transport().
+    Сообщения не пишутся сразу, а копятся в outbox и уходят одним write()
+    после обработки всего, что пришло за одно чтение (DurakServer.flush_outboxes()).
+    """
+
+    def __init__(self, addr, server):
         self.addr = addr
         self.server = server
         self.player_name = f"Player{addr[1]}"
         self.lobby: Optional[Lobby] = None
         self.running = True
+        self.decoder = MessageDecoder()
+        self.pending_handoff = None  # (воркер, сообщение) - лобби живет в другом процессе
+        self.binary = False  # Формат отправки, выбирается сообщением hello
+        self.game_view: Optional[Dict] = None  # Последнее отправленное состояние стола
+        self.game_seq = 0  # Номер последнего сообщения о столе
+        self.seat: Optional[int] = None  # Место в партии: индекс игрока в движке, не меняется до конца игры
+        self.outbox: List[tuple] = []  # (action, кадр) - еще не отправлено
+        self.outbox_lock = threading.Lock()  # в режиме threaded в очередь пишут потоки других клиентов
         
-    def run(self):
-        try:
-            while self.running:
-                data = self.conn.recv(BUFFER_SIZE)
-                if not data:
-                    break
-                    
-                try:
-                    message = json.loads(data.decode())
-                    self.handle_message(message)
-                except json.JSONDecodeError:
-                    self.send_error("Invalid JSON format")
-                    
-        except ConnectionError:
-            pass
-        finally:
-            self.disconnect()
+    def handle_frames(self, frames: List[bytes]):
+        # За одно чтение может прийти несколько сообщений или только часть одного
+        for i, frame in enumerate(frames):
+            try:
+                message = decode_message(frame)
+            except ValueError:
+                self.send_error("Invalid message format")
+                continue
+            with self.server.lock:
+                self.handle_message(message)
+            self.server.listing.flush()
+            
+            if self.pending_handoff:
+                # Клиент переезжает в процесс лобби вместе с еще не обработанными сообщениями
+                self.server.flush_outboxes()
+                worker_id, handoff_message = self.pending_handoff
+                self.pending_handoff = None
+                if self.server.hand_off(self, worker_id, handoff_message, frames[i + 1:]):
+                    return
+        self.server.flush_outboxes()
             
     def handle_message(self, message: Dict):
         if not isinstance(message, dict) or "action" not in message:
@@ -81,7 +245,9 @@ class ClientHandler(threading.Thread):
             
         action = message["action"]
         
-        if action == "set_name":
+        if action == "hello":
+            self.negotiate(message.get("formats"))
+        elif action == "set_name":
             self.set_name(message.get("name"))
         elif action == "create_lobby":
             self.create_lobby(message.get("name"), message.get("password"))
@@ -92,12 +258,23 @@ class ClientHandler(threading.Thread):
         elif action == "start_game":
             self.start_game()
         elif action == "list_lobbies":
-            self.list_lobbies()
+            self.list_lobbies(message.get("offset", 0), message.get("limit", LOBBY_PAGE_SIZE),
+                              bool(message.get("joinable_only")), bool(message.get("subscribe")))
+        elif action == "unsubscribe_lobbies":
+            self.server.listing.unsubscribe(self)
         elif action == "game_action":
             self.handle_game_action(message)
+        elif action == "game_resync":
+            self.resync_game()
         else:
             self.send_error(f"Unknown action: {action}")
             
+    def negotiate(self, formats):
+        wire_format = choose_format(formats)
+        # Ответ еще в старом формате, дальше - в выбранном (кадр кодируется при постановке в очередь)
+        self.send_message({"action": "hello", "format": wire_format})
+        self.binary = wire_format == FORMAT_BINARY
+        
     def set_name(self, name: str):
         if name and isinstance(name, str) and 2 <= len(name) <= 20:
             self.player_name = name
@@ -114,15 +291,15 @@ class ClientHandler(threading.Thread):
             self.send_error("Lobby name must be 1-20 characters")
             return
             
-        lobby_id = f"lobby{random.randint(1000, 9999)}"
-        while lobby_id in [l.id for l in self.server.lobbies]:
-            lobby_id = f"lobby{random.randint(1000, 9999)}"
+        if self.server.lobby_limit_reached():
+            self.send_error("Too many lobbies, try again later")
+            return
             
-        self.lobby = Lobby(lobby_id, name, self)
+        self.lobby = Lobby(self.server.new_lobby_id(), name, self)
         if password:
             self.lobby.password = password
             
-        self.server.lobbies.append(self.lobby)
+        self.server.add_lobby(self.lobby)
         self.send_success("Lobby created", {
             "lobby": self.lobby.get_info(),
             "creator": self.player_name  # Добавляем информацию о создателе
@@ -134,8 +311,12 @@ class ClientHandler(threading.Thread):
             self.send_error("You are already in a lobby")
             return
             
-        lobby = next((l for l in self.server.lobbies if l.id == lobby_id), None)
+        lobby = self.server.find_lobby(lobby_id)
         if not lobby:
+            owner = self.server.remote_lobby_owner(lobby_id)
+            if owner is not None:
+                self.pending_handoff = (owner, {"action": "join_lobby", "lobby_id": lobby_id, "password": password})
+                return
             self.send_error("Lobby not found")
             return
             
@@ -153,6 +334,7 @@ class ClientHandler(threading.Thread):
             
         if lobby.add_player(self):
             self.lobby = lobby
+            self.server.lobby_changed(lobby)
             self.send_success("Joined lobby", {"lobby": lobby.get_info()})
             self.broadcast_lobby_update()
             
@@ -167,9 +349,17 @@ class ClientHandler(threading.Thread):
             self.send_error("Not in a lobby")
             return
             
-        was_creator = self.lobby.creator == self
-        self.lobby.remove_player(self)
+        lobby = self.lobby
+        was_creator = lobby.creator == self
+        if lobby.engine and lobby.engine.winner is None and len(lobby.players) > 1:
+            # Игрок покинул партию - победа остается за соперником
+            lobby.engine.winner = next(p.seat for p in lobby.players if p != self)
+            self.broadcast_game_state(exclude=self)
+        lobby.remove_player(self)
         self.lobby = None
+        self.seat = None
+        if lobby.players:
+            self.server.lobby_changed(lobby)
         
         self.send_success("Left lobby")
         if not was_creator:  # чтобы избежать двойной рассылки при удалении лобби
@@ -184,60 +374,113 @@ class ClientHandler(threading.Thread):
             self.send_error("Only lobby creator can start the game")
             return
             
+        if self.lobby.game_started:
+            self.send_error("Game already started")
+            return
+            
         # Убираем проверку на минимальное количество игроков
         self.lobby.game_started = True
+        self.server.lobby_changed(self.lobby)
         self.broadcast_lobby_update()
         
+        # Одна колода и одна тасовка на партию - у всех клиентов одинаковый стол
+        engine = DurakEngine([p.player_name for p in self.lobby.players])
+        engine.deal()
+        self.lobby.engine = engine
+        
         # Инициализация игры
-        for player in self.lobby.players:
+        for i, player in enumerate(self.lobby.players):
+            state = engine.state_for(i)
+            player.seat, player.game_view, player.game_seq = i, state, 0
             game_init = {
                 "action": "game_start",
                 "players": [{
-                    "id": i,
+                    "id": j,
                     "name": p.player_name,
                     "is_you": p == player  # ФИКС: Только для текущего игрока
-                } for i, p in enumerate(self.lobby.players)],
-                "trump_suit": random.choice(["♠", "♥", "♦", "♣"]),
-                "forced_start": len(self.lobby.players) < self.lobby.max_players
+                } for j, p in enumerate(self.lobby.players)],
+                "trump_suit": engine.trump_suit,
+                "forced_start": len(self.lobby.players) < self.lobby.max_players,
+                "your_index": i,
+                "state": state,
+                "seq": 0
             }
             player.send_message(game_init)
-        
-        for i, player in enumerate(self.lobby.players):
-            player.send_message(game_init)
                 
     def handle_game_action(self, message: Dict):
-        if not self.lobby or not self.lobby.game_started:
+        if not self.lobby or not self.lobby.game_started or not self.lobby.engine or self.seat is None:
             self.send_error("Game not started")
             return
             
-        # Пересылаем действие всем игрокам в лобби
+        # Сервер - единственный источник правды: ход проверяется здесь, а не у клиентов
+        engine = self.lobby.engine
+        player_idx = self.seat
+        move_type = message.get("type")
+        if move_type == "play":
+            card = message.get("card")
+            accepted = isinstance(card, str) and engine.play_card(player_idx, card)
+        elif move_type == "pass":
+            accepted = engine.pass_move(player_idx)
+        else:
+            self.send_error(f"Unknown game action: {move_type}")
+            return
+            
+        if not accepted:
+            self.send_error("Invalid move")
+            return
+            
+        engine.check_game_over()
+        self.broadcast_game_state({"player_idx": player_idx, "type": move_type, "card": message.get("card")})
+        
+    def broadcast_game_state(self, last_move: Optional[Dict] = None, exclude: 'ClientSession' = None):
+        engine = self.lobby.engine
         for player in self.lobby.players:
-            if player != self:  # Отправителю не нужно отправлять его же действие
-                player.send_message(message)
-                
-    def list_lobbies(self):
-        try:
-            # Получаем актуальный список всех лобби (не только текущего клиента)
-            all_lobbies = self.server.lobbies
-            
-            # Формируем информацию о лобби
-            lobbies_info = []
-            for lobby in all_lobbies:
-                # Включаем лобби, даже если игра началась (но помечаем это)
-                lobby_info = lobby.get_info()
+            if player is not exclude:
+                player.send_game_update(engine.state_for(player.seat), last_move)
                 
-                # Добавляем дополнительную информацию
-                lobby_info.update({
-                    "can_join": not lobby.game_started and len(lobby.players) < lobby.max_players,
-                    "is_yours": self in lobby.players
-                })
+    def send_game_update(self, state: Dict, last_move: Optional[Dict] = None):
+        """Изменения стола с прошлой отправки (game_delta), а если отправок не было - снимок (game_state).
+
+        Сообщения нумеруются подряд: пропуск номера клиент видит и просит снимок (game_resync).
+        """
+        self.game_seq += 1
+        if self.game_view is None:
+            message = dict(state, action="game_state")
+        else:
+            message = state_delta(self.game_view, state)
+            message["action"] = "game_delta"
+        message["seq"] = self.game_seq
+        message["last_move"] = last_move
+        self.game_view = state
+        self.send_message(message)
+        
+    def resync_game(self):
+        if not self.lobby or not self.lobby.engine or self.seat is None:
+            self.send_error("Game not started")
+            return
+        self.game_view = None
+        self.send_game_update(self.lobby.engine.state_for(self.seat))
                 
-                lobbies_info.append(lobby_info)
+    def list_lobbies(self, offset: int = 0, limit: int = LOBBY_PAGE_SIZE,
+                     joinable_only: bool = False, subscribe: bool = False):
+        if not isinstance(offset, int) or not isinstance(limit, int) or offset < 0 or limit <= 0:
+            self.send_error("Invalid page")
+            return
+            
+        try:
+            # Готовые словари из кэша, без пересборки get_info() для каждого лобби
+            lobbies_info, total, version = self.server.listing.snapshot(
+                self, offset, min(limit, MAX_LOBBY_PAGE_SIZE), joinable_only, subscribe)
             
-            # Отправляем полный список
+            # Отправляем страницу списка; свое лобби клиент узнает по your_lobby
             self.send_success("Lobbies list", {
                 "action": "lobbies_list",  # Явно указываем действие
-                "lobbies": lobbies_info
+                "lobbies": lobbies_info,
+                "version": version,
+                "offset": offset,
+                "total": total,
+                "subscribed": subscribe,
+                "your_lobby": self.lobby.id if self.lobby else None
             })
             
             print(f"Sent lobbies list to {self.player_name}: {len(lobbies_info)} lobbies")  # Логирование
@@ -257,10 +500,22 @@ class ClientHandler(threading.Thread):
             })
             
     def send_message(self, message: Dict):
-        try:
-            self.conn.sendall(json.dumps(message).encode())
-        except ConnectionError:
-            self.disconnect()
+        self.queue_frame(message.get("action"), encode_message(message, self.binary))
+        
+    def queue_frame(self, action: Optional[str], data: bytes):
+        """Кадр в очередь отправки; устаревшие им кадры (OUTBOX_SUPERSEDES) из нее убираются"""
+        kinds = OUTBOX_SUPERSEDES.get(action, ())
+        with self.outbox_lock:
+            if kinds:
+                self.outbox = [entry for entry in self.outbox if entry[0] not in kinds]
+            self.outbox.append((action, data))
+        self.server.outbox_touched(self)
+        
+    def flush_outbox(self):
+        with self.outbox_lock:
+            outbox, self.outbox = self.outbox, []
+        if outbox and self.running:
+            self.write(b"".join(data for _, data in outbox))
             
     def send_success(self, message: str, data: Dict = None):
         response = {"status": "success", "message": message}
@@ -271,53 +526,537 @@ class ClientHandler(threading.Thread):
     def send_error(self, message: str):
         self.send_message({"status": "error", "message": message})
         
+    @abc.abstractmethod
+    def write(self, data: bytes):
+        """Отправка готовых байт клиенту без ожидания медленного клиента"""
+        
+    @abc.abstractmethod
+    def close_transport(self):
+        """Закрытие соединения после отправки того, что уже записано"""
+        
     def disconnect(self):
         if self.running:
+            self.server.flush_outboxes()  # Например, ошибка, из-за которой клиент отключается
             self.running = False
+            self.server.listing.unsubscribe(self)
             if self.lobby:
-                self.leave_lobby()
-            self.conn.close()
+                with self.server.lock:
+                    self.leave_lobby()
+                self.server.listing.flush()
+                self.server.flush_outboxes()
+            self.close_transport()
             self.server.remove_client(self)
 
+class ClientHandler(ClientSession, threading.Thread):
+    """Клиент в отдельном потоке (блокирующий режим сервера).
+
+    Отправка идет через свой поток-писатель: поток, разославший сообщение,
+    не ждет sendall() медленного клиента.
+    """
+
+    def __init__(self, conn, addr, server):
+        threading.Thread.__init__(self)
+        ClientSession.__init__(self, addr, server)
+        self.conn = conn
+        self.send_queue: List[bytes] = []
+        self.send_size = 0  # байт в send_queue
+        self.send_ready = threading.Condition()
+        self.closing = False
+        self.writer = threading.Thread(target=self.send_loop, daemon=True)
+        
+    def run(self):
+        self.writer.start()
+        try:
+            while self.running:
+                frames = self.decoder.recv_from(self.conn)
+                if frames is None:
+                    break
+                self.handle_frames(frames)
+                    
+        except ProtocolError as e:
+            self.send_error(str(e))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.disconnect()
+            
+    def write(self, data: bytes):
+        with self.send_ready:
+            if self.closing:
+                return
+            self.send_queue.append(data)
+            self.send_size += len(data)
+            overflow = self.send_size > MAX_WRITE_BUFFER
+            self.send_ready.notify()
+        if overflow:
+            # Медленный клиент не должен копить неограниченный буфер в памяти сервера
+            print(f"Client {self.addr} is too slow, disconnecting")
+            self.shutdown_socket()
+            
+    def send_loop(self):
+        while True:
+            with self.send_ready:
+                while not self.send_queue and not self.closing:
+                    self.send_ready.wait()
+                if not self.send_queue:
+                    break
+                data = b"".join(self.send_queue)
+                self.send_queue.clear()
+                self.send_size = 0
+            try:
+                self.conn.sendall(data)
+            except (ConnectionError, OSError):
+                # Отключение обработает поток чтения, получив ошибку или EOF
+                self.shutdown_socket()
+                break
+        self.conn.close()
+        
+    def shutdown_socket(self):
+        try:
+            self.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+            
+    def close_transport(self):
+        # Поток-писатель отправит остаток очереди и закроет сокет
+        with self.send_ready:
+            self.closing = True
+            self.send_ready.notify()
+
+class AsyncClientHandler(ClientSession, asyncio.BufferedProtocol):
+    """Клиент в цикле событий asyncio: без потоков, чтение прямо в буфер разборщика"""
+
+    def __init__(self, server, adopted: Optional[Dict] = None):
+        self.server = server
+        self.transport = None
+        self.adopted = adopted  # состояние клиента, переданного другим воркером
+        
+    def connection_made(self, transport):
+        ClientSession.__init__(self, transport.get_extra_info("peername"), self.server)
+        self.transport = transport
+        self.server.clients.add(self)
+        if not self.adopted:
+            print(f"New connection from {self.addr}")
+            return
+            
+        # Продолжаем с того места, где остановился предыдущий воркер
+        print(f"Client {self.addr} handed over from worker {self.adopted['worker']}")
+        self.player_name = self.adopted["player_name"]
+        self.binary = self.adopted.get("binary", False)
+        with self.server.lock:
+            self.handle_message(self.adopted["message"])
+            if self.pending_handoff:
+                # Пока клиент переезжал, лобби ушло из этого воркера - второй раз не передаем
+                self.pending_handoff = None
+                self.send_error("Lobby not found")
+        self.server.listing.flush()
+        self.server.flush_outboxes()
+        pending = base64.b64decode(self.adopted["pending"])
+        self.adopted = None
+        if pending:
+            self.buffer_updated_from(pending)
+        
+    def buffer_updated_from(self, data: bytes):
+        try:
+            self.handle_frames(self.decoder.feed(data))
+        except ProtocolError as e:
+            self.send_error(str(e))
+            self.disconnect()
+        
+    def get_buffer(self, sizehint):
+        return self.decoder.recv_view
+        
+    def buffer_updated(self, nbytes):
+        self.buffer_updated_from(self.decoder.recv_view[:nbytes])
+            
+    def eof_received(self):
+        self.disconnect()
+        
+    def connection_lost(self, exc):
+        self.disconnect()
+        
+    def write(self, data: bytes):
+        if self.transport.is_closing():
+            return
+        self.transport.write(data)
+        # Медленный клиент не должен копить неограниченный буфер в памяти сервера
+        if self.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            print(f"Client {self.addr} is too slow, disconnecting")
+            self.disconnect()
+            
+    def close_transport(self):
+        self.transport.close()
+        
+    def detach(self):
+        """Отпустить соединение, не разрывая его: сокет уже передан другому процессу"""
+        self.running = False
+        self.server.listing.unsubscribe(self)
+        self.server.remove_client(self)
+        self.transport.close()
+
 class DurakServer:
-    def __init__(self):
-        self.clients: List[ClientHandler] = []
-        self.lobbies: List[Lobby] = []
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    def __init__(self, host: str = SERVER_HOST, port: int = SERVER_PORT, backlog: int = LISTEN_BACKLOG,
+                 server_socket: Optional[socket.socket] = None, max_lobbies: int = MAX_LOBBIES):
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.clients: Set[ClientSession] = set()
+        self.lobbies = LobbyRegistry(max_lobbies=max_lobbies)
+        self.listing = LobbyListing()
+        self.flush_local = threading.local()  # клиенты с неотправленными кадрами, свои у каждого потока
+        # Режим threaded: сообщения клиентов обрабатываются по одному - партии и реестр лобби
+        # меняются только под ним. Отправка (flush_outboxes) идет уже без блокировки
+        self.lock = threading.RLock()
+        if server_socket is None:
+            server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket = server_socket
         
     def start(self):
-        self.server_socket.bind((SERVER_HOST, SERVER_PORT))
-        self.server_socket.listen(5)
-        print(f"Server started on {SERVER_HOST}:{SERVER_PORT}")
+        """Блокирующий режим: поток на каждое соединение"""
+        self.server_socket.bind((self.host, self.port))
+        self.server_socket.listen(self.backlog)
+        print(f"Server started on {self.host}:{self.port} (threaded)")
         
         try:
             while True:
                 conn, addr = self.server_socket.accept()
                 print(f"New connection from {addr}")
                 client = ClientHandler(conn, addr, self)
-                self.clients.append(client)
+                self.clients.add(client)
                 client.start()
         finally:
             self.stop()
             
-    def remove_client(self, client: ClientHandler):
-        if client in self.clients:
-            self.clients.remove(client)
+    def start_async(self):
+        """Режим цикла событий: все соединения в одном потоке"""
+        try:
+            asyncio.run(self.serve_async())
+        finally:
+            self.stop()
+            
+    async def serve_async(self):
+        self.server_socket.bind((self.host, self.port))
+        print(f"Server started on {self.host}:{self.port} (async)")
+        await self.serve_on_socket()
+        
+    async def serve_on_socket(self):
+        self.server_socket.setblocking(False)
+        loop = asyncio.get_running_loop()
+        # listen(backlog) вызывает сам asyncio при старте
+        server = await loop.create_server(lambda: AsyncClientHandler(self),
+                                          sock=self.server_socket, backlog=self.backlog)
+        async with server:
+            await server.serve_forever()
+            
+    def remove_client(self, client: ClientSession):
+        self.clients.discard(client)
+        
+    def outbox_touched(self, client: ClientSession):
+        clients = getattr(self.flush_local, "clients", None)
+        if clients is None:
+            clients = self.flush_local.clients = set()
+        clients.add(client)
+        
+    def flush_outboxes(self):
+        """Отправка очередей всех клиентов, которым этот поток что-то поставил"""
+        clients = getattr(self.flush_local, "clients", None)
+        while clients:
+            # pop(): write() может отключить клиента и снова вызвать flush_outboxes()
+            clients.pop().flush_outbox()
+            
+    def new_lobby_id(self) -> str:
+        return self.lobbies.new_id()
+        
+    def find_lobby(self, lobby_id: str) -> Optional[Lobby]:
+        return self.lobbies.get(lobby_id)
+        
+    def lobby_limit_reached(self) -> bool:
+        return self.lobbies.is_full()
+        
+    def remote_lobby_owner(self, lobby_id: str) -> Optional[int]:
+        """Номер воркера, в котором живет лобби (только для многопроцессного режима)"""
+        return None
+        
+    def add_lobby(self, lobby: Lobby):
+        self.lobbies.add(lobby)
+        self.lobby_changed(lobby)
+        
+    def lobby_changed(self, lobby: Lobby):
+        """Вызывается после любого изменения лобби (игроки, статус игры)"""
+        self.listing.update(self.listing_info(lobby))
+        
+    def listing_info(self, lobby: Lobby) -> Dict:
+        info = lobby.get_info()
+        info["can_join"] = lobby.is_joinable()
+        return info
+        
+    def hand_off(self, client: ClientSession, worker_id: int, message: Dict, frames: List[bytes]) -> bool:
+        """Передача клиента воркеру-владельцу лобби: True - клиент ушел из этого процесса.
+
+        В одном процессе чужих лобби нет (remote_lobby_owner() всегда None),
+        так что передавать некуда.
+        """
+        client.send_error("Lobby not found")
+        return False
             
-    def remove_lobby(self, lobby: Lobby):
-        if lobby in self.lobbies:
-            self.lobbies.remove(lobby)
+    def remove_lobby(self, lobby: Lobby) -> bool:
+        if not self.lobbies.remove(lobby):
+            return False
+        self.listing.remove(lobby.id)
+        return True
             
     def stop(self):
         print("Shutting down server...")
-        for client in self.clients[:]:
+        for client in list(self.clients):
             client.disconnect()
         self.server_socket.close()
 
+class WorkerLink:
+    """Канал к соседнему воркеру.
+
+    SOCK_SEQPACKET сохраняет границы сообщений и умеет передавать файловые
+    дескрипторы; если буфер канала полон, сообщения ждут в очереди.
+    """
+
+    def __init__(self, sock: socket.socket, on_message, on_close):
+        self.sock = sock
+        self.sock.setblocking(False)
+        self.on_message = on_message
+        self.on_close = on_close
+        self.queue = collections.deque()
+        self.loop = None
+        
+    def attach(self, loop):
+        self.loop = loop
+        loop.add_reader(self.sock.fileno(), self.read)
+        
+    def send(self, message: Dict, fd: Optional[int] = None) -> bool:
+        """False - сообщение не ушло (больше MAX_LINK_MESSAGE или канал сломан), fd остается у вызывающего"""
+        data = json.dumps(message).encode()
+        if len(data) > MAX_LINK_MESSAGE:
+            return False
+        if not self.queue:
+            try:
+                self.send_now(data, fd)
+                return True
+            except BlockingIOError:
+                self.loop.add_writer(self.sock.fileno(), self.flush)
+            except OSError as e:
+                print(f"Worker link error: {e}")
+                return False
+        self.queue.append((data, fd))
+        return True
+        
+    def send_now(self, data: bytes, fd: Optional[int]):
+        if fd is None:
+            self.sock.send(data)
+        else:
+            socket.send_fds(self.sock, [data], [fd])
+            os.close(fd)
+            
+    def flush(self):
+        while self.queue:
+            data, fd = self.queue[0]
+            try:
+                self.send_now(data, fd)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                print(f"Worker link error: {e}")
+                if fd is not None:
+                    os.close(fd)
+            self.queue.popleft()
+        self.loop.remove_writer(self.sock.fileno())
+        
+    def read(self):
+        while True:
+            try:
+                data, fds, _flags, _addr = socket.recv_fds(self.sock, MAX_LINK_MESSAGE, 1)
+            except BlockingIOError:
+                return
+            if not data:
+                # Соседний воркер завершился
+                self.loop.remove_reader(self.sock.fileno())
+                self.on_close()
+                return
+            self.on_message(json.loads(data), fds)
+
+class ShardedDurakServer(DurakServer):
+    """Воркер многопроцессного сервера.
+
+    Лобби закреплено за воркером, в котором его создали. Каталог всех лобби
+    (кэш списка listing) реплицируется между воркерами, а клиент, входящий
+    в чужое лобби, передается процессу-владельцу вместе с сокетом.
+    """
+
+    def __init__(self, worker_id: int, server_socket: socket.socket, links: Dict[int, socket.socket],
+                 backlog: int = LISTEN_BACKLOG, max_lobbies: int = MAX_LOBBIES):
+        host, port = server_socket.getsockname()[:2]
+        super().__init__(host, port, backlog, server_socket, max_lobbies)
+        self.worker_id = worker_id
+        self.lobbies.id_prefix = f"lobby{worker_id}-"
+        self.owners: Dict[str, int] = {}  # id лобби другого воркера -> номер воркера
+        self.links = {
+            peer: WorkerLink(sock, self.handle_link_message, lambda peer=peer: self.worker_gone(peer))
+            for peer, sock in links.items()
+        }
+        
+    async def serve_async(self):
+        loop = asyncio.get_running_loop()
+        for link in self.links.values():
+            link.attach(loop)
+        print(f"Worker {self.worker_id} (pid {os.getpid()}) serving {self.host}:{self.port}")
+        await self.serve_on_socket()
+        
+    def broadcast_to_workers(self, message: Dict):
+        for link in self.links.values():
+            link.send(message)
+            
+    def lobby_limit_reached(self) -> bool:
+        # Лимит общий на все воркеры
+        return len(self.listing.entries) >= self.lobbies.max_lobbies
+        
+    def remote_lobby_owner(self, lobby_id: str) -> Optional[int]:
+        return self.owners.get(lobby_id)
+        
+    def lobby_changed(self, lobby: Lobby):
+        super().lobby_changed(lobby)
+        self.broadcast_to_workers({"type": "lobby", "worker": self.worker_id,
+                                   "lobby": self.listing.entries[lobby.id]})
+        
+    def remove_lobby(self, lobby: Lobby) -> bool:
+        if not super().remove_lobby(lobby):
+            return False
+        self.broadcast_to_workers({"type": "lobby_removed", "id": lobby.id})
+        return True
+            
+    def hand_off(self, client: 'AsyncClientHandler', worker_id: int, message: Dict, frames: List[bytes]) -> bool:
+        # Все, что клиент прислал после join_lobby, обработает новый воркер
+        pending = b"".join(encode_frame(frame) for frame in frames) + bytes(client.decoder.buffer)
+        fd = os.dup(client.transport.get_extra_info("socket").fileno())
+        sent = self.links[worker_id].send({
+            "type": "client",
+            "worker": self.worker_id,
+            "player_name": client.player_name,
+            "binary": client.binary,
+            "message": message,
+            "pending": base64.b64encode(pending).decode()
+        }, fd)
+        if not sent:
+            # Клиент остается здесь: дальше его сообщения обрабатывает этот воркер
+            os.close(fd)
+            client.send_error("Could not join lobby, try again")
+            return False
+        client.detach()
+        return True
+        
+    def handle_link_message(self, message: Dict, fds: List[int]):
+        kind = message.get("type")
+        if kind == "lobby":
+            self.owners[message["lobby"]["id"]] = message["worker"]
+            self.listing.update(message["lobby"])
+            self.listing.flush()
+        elif kind == "lobby_removed":
+            self.owners.pop(message["id"], None)
+            self.listing.remove(message["id"])
+            self.listing.flush()
+        elif kind == "client" and fds:
+            conn = socket.socket(fileno=fds.pop(0))
+            loop = asyncio.get_running_loop()
+            loop.create_task(loop.connect_accepted_socket(
+                lambda: AsyncClientHandler(self, adopted=message), conn))
+        for fd in fds:
+            os.close(fd)
+        self.flush_outboxes()
+        
+    def worker_gone(self, worker_id: int):
+        """Соседний воркер завершился: его лобби больше не существуют"""
+        print(f"Worker {worker_id} is gone, dropping its lobbies")
+        for lobby_id in [lobby_id for lobby_id, owner in self.owners.items() if owner == worker_id]:
+            del self.owners[lobby_id]
+            self.listing.remove(lobby_id)
+        self.listing.flush()
+        self.flush_outboxes()
+
+def run_worker(worker_id: int, server_socket: socket.socket, pairs: Dict, backlog: int, max_lobbies: int):
+    links = {}
+    for (first, second), (first_end, second_end) in pairs.items():
+        if first == worker_id:
+            links[second] = first_end
+            second_end.close()
+        elif second == worker_id:
+            links[first] = second_end
+            first_end.close()
+        else:
+            first_end.close()
+            second_end.close()
+    server = ShardedDurakServer(worker_id, server_socket, links, backlog, max_lobbies)
+    try:
+        server.start_async()
+    except KeyboardInterrupt:
+        pass
+
+def run_sharded(host: str, port: int, backlog: int, workers: int, max_lobbies: int = MAX_LOBBIES):
+    """Супервизор: общий слушающий сокет и N воркеров, связанных каналами попарно"""
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_socket.bind((host, port))
+    server_socket.listen(backlog)
+    
+    pairs = {
+        (first, second): socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        for first in range(workers) for second in range(first + 1, workers)
+    }
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=run_worker, args=(worker_id, server_socket, pairs, backlog, max_lobbies),
+                        name=f"durak-worker-{worker_id}")
+        for worker_id in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for first_end, second_end in pairs.values():
+        first_end.close()
+        second_end.close()
+    print(f"Server started on {host}:{port} ({workers} workers)")
+    
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+    finally:
+        server_socket.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Durak Online server")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--mode", choices=["async", "threaded"], default="async",
+                        help="async - один цикл событий, threaded - поток на клиента")
+    parser.add_argument("--backlog", type=int, default=LISTEN_BACKLOG,
+                        help="Размер очереди входящих соединений (listen backlog)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Число процессов-воркеров (0 - один процесс)")
+    parser.add_argument("--max-lobbies", type=int, default=MAX_LOBBIES,
+                        help="Максимальное число одновременно открытых лобби")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    server = DurakServer()
+    args = parse_args()
+    if args.workers > 0:
+        run_sharded(args.host, args.port, args.backlog, args.workers, args.max_lobbies)
+        raise SystemExit
+        
+    server = DurakServer(args.host, args.port, args.backlog, max_lobbies=args.max_lobbies)
     try:
-        server.start()
+        if args.mode == "async":
+            server.start_async()
+        else:
+            server.start()
     except KeyboardInterrupt:
-        server.stop()
\ No newline at end of file
+        pass
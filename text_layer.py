@@ -0,0 +1,66 @@
+from typing import Dict, List, Set
+
+import arcade
+import pyglet
+
+# Текст интерфейса без разметки на каждом кадре: arcade.draw_text держит
+# одну метку на стиль и заново раскладывает ее при каждой смене строки,
+# а здесь каждая надпись - своя метка pyglet, которая живет, пока ее рисуют.
+
+
+class TextLayer:
+    """Кэш надписей по (слой, строка, позиция, шрифт, размер, цвет, выравнивание).
+
+    draw() вызывается вместо arcade.draw_text: новая надпись раскладывается
+    один раз, дальше только отмечается как нужная. Надписи копятся в Batch
+    текущего слоя, flush() рисует слой одним вызовом - между слоями можно
+    рисовать фигуры, которые должны лечь поверх текста. Надписи слоя, которые
+    в этом кадре не запрашивались, flush() удаляет до рисования, а end_frame() -
+    оставшиеся в слоях, до которых кадр не дошел.
+    """
+
+    def __init__(self):
+        self.labels: Dict[tuple, pyglet.text.Label] = {}
+        self.batches: List[pyglet.graphics.Batch] = []
+        self.used: Set[tuple] = set()
+        self.layer = 0
+
+    def draw(self, text, start_x: float, start_y: float, color=arcade.color.WHITE, font_size: float = 12,
+             width: int = 0, align: str = "left", font_name=("calibri", "arial"), bold: bool = False,
+             italic: bool = False, anchor_x: str = "left", anchor_y: str = "baseline", multiline: bool = False):
+        text = str(text)
+        color = arcade.get_four_byte_color(color)
+        if isinstance(font_name, list):
+            font_name = tuple(font_name)
+        if align != "left":
+            multiline = True  # Как в arcade.draw_text: выравнивание работает только в многострочной метке
+        # Слой входит в ключ: смена Batch у метки pyglet - это полная перераскладка
+        key = (self.layer, text, start_x, start_y, color, font_size, width, align, font_name,
+               bold, italic, anchor_x, anchor_y, multiline)
+
+        while len(self.batches) <= self.layer:
+            self.batches.append(pyglet.graphics.Batch())
+        if key not in self.labels:
+            self.labels[key] = pyglet.text.Label(
+                text, x=start_x, y=start_y, font_name=font_name, font_size=font_size,
+                bold=bold, italic=italic, color=color, anchor_x=anchor_x, anchor_y=anchor_y,
+                width=width, align=align, multiline=multiline, batch=self.batches[self.layer])
+        self.used.add(key)
+
+    def flush(self):
+        """Нарисовать надписи текущего слоя, следующие draw() пойдут в новый слой"""
+        if self.layer < len(self.batches):
+            # Старая версия изменившейся строки не должна попасть в кадр
+            stale = [key for key in self.labels if key[0] == self.layer and key not in self.used]
+            for key in stale:
+                self.labels.pop(key).delete()
+            with arcade.get_window().ctx.pyglet_rendering():
+                self.batches[self.layer].draw()
+        self.layer += 1
+
+    def end_frame(self):
+        self.flush()
+        for key in self.labels.keys() - self.used:
+            self.labels.pop(key).delete()
+        self.used.clear()
+        self.layer = 0
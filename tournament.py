@@ -0,0 +1,145 @@
+import argparse
+import concurrent.futures
+import itertools
+import os
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from durak_engine import DurakEngine, greedy_move
+from mcts_bot import choose_move
+
+# Турнир ботов по кругу: каждая пара стратегий играет серию партий на
+# настоящем DurakEngine, партии раздаются по процессам. В конце - таблица
+# побед и рейтинг Эло по всем партиям.
+
+MAX_MOVES = 400  # Партия без победителя после стольких ходов - ничья
+ELO_START = 1500.0
+ELO_K = 16.0
+GAMES_PER_TASK = 20
+
+
+def greedy_policy(engine: DurakEngine, player_idx: int, rng: random.Random, options: Dict) -> Optional[int]:
+    """Нынешний бот одиночной игры до MCTS"""
+    return greedy_move(engine, player_idx)
+
+
+def random_policy(engine: DurakEngine, player_idx: int, rng: random.Random, options: Dict) -> Optional[int]:
+    moves: List[Optional[int]] = list(engine.valid_moves(player_idx))
+    if engine.game_phase != "attack":
+        moves.append(None)  # Пас
+    return rng.choice(moves) if moves else None
+
+
+def mcts_policy(engine: DurakEngine, player_idx: int, rng: random.Random, options: Dict) -> Optional[int]:
+    key = choose_move(engine, player_idx, options["mcts_budget"], seed=rng.getrandbits(32))
+    return None if key is None else engine.hands[player_idx].index(key)
+
+
+# Стратегия: (движок, игрок, rng, параметры) -> индекс карты в руке или None - пас
+POLICIES: Dict[str, Callable] = {
+    "greedy": greedy_policy,
+    "random": random_policy,
+    "mcts": mcts_policy,
+}
+
+
+def play_game(names: Tuple[str, str], seed: int, options: Dict) -> Optional[int]:
+    """Одна партия, names[i] играет за игрока i. Возвращает победителя или None"""
+    rng = random.Random(seed)
+    engine = DurakEngine(list(names), rng=random.Random(seed))
+    engine.deal()
+    for _ in range(MAX_MOVES):
+        player = engine.current_player_idx
+        card_idx = POLICIES[names[player]](engine, player, rng, options)
+        if card_idx is None:
+            accepted = engine.pass_move(player)
+        else:
+            accepted = engine.make_move(player, card_idx)
+        if not accepted:
+            return None  # Стратегия предлагает недопустимый ход - партия дальше не пойдет, ничья
+        if engine.check_game_over():
+            return engine.winner
+    return None
+
+
+def play_games(pair: Tuple[str, str], seeds: List[int], options: Dict) -> List[Tuple[int, str, str, Optional[str]]]:
+    """Задача для процесса: партии пары с чередованием мест. (seed, игрок 0, игрок 1, победитель)"""
+    results = []
+    for seed in seeds:
+        names = pair if seed % 2 == 0 else pair[::-1]
+        winner = play_game(names, seed, options)
+        results.append((seed, names[0], names[1], None if winner is None else names[winner]))
+    return results
+
+
+def elo_ratings(results, policies: List[str]) -> Dict[str, float]:
+    """Эло по партиям в порядке seed, ничья - пол-очка"""
+    ratings = {name: ELO_START for name in policies}
+    for _, first, second, winner in sorted(results):
+        expected = 1 / (1 + 10 ** ((ratings[second] - ratings[first]) / 400))
+        score = 0.5 if winner is None else float(winner == first)
+        ratings[first] += ELO_K * (score - expected)
+        ratings[second] -= ELO_K * (score - expected)
+    return ratings
+
+
+def run_tournament(policies: List[str], games_per_pair: int, workers: int, options: Dict,
+                   seed: int = 0) -> Dict:
+    tasks = []
+    for pair_idx, pair in enumerate(itertools.combinations(policies, 2)):
+        seeds = [seed + pair_idx * games_per_pair + i for i in range(games_per_pair)]
+        for start in range(0, len(seeds), GAMES_PER_TASK):
+            tasks.append((pair, seeds[start:start + GAMES_PER_TASK]))
+
+    started = time.perf_counter()
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_games, pair, seeds, options) for pair, seeds in tasks]
+        for future in concurrent.futures.as_completed(futures):
+            results.extend(future.result())
+    elapsed = time.perf_counter() - started
+
+    stats = {name: {"games": 0, "wins": 0, "losses": 0, "draws": 0} for name in policies}
+    for _, first, second, winner in results:
+        for name in (first, second):
+            stats[name]["games"] += 1
+            if winner is None:
+                stats[name]["draws"] += 1
+            elif winner == name:
+                stats[name]["wins"] += 1
+            else:
+                stats[name]["losses"] += 1
+    return {
+        "stats": stats,
+        "elo": elo_ratings(results, policies),
+        "games": len(results),
+        "games_per_sec": len(results) / elapsed if elapsed else 0.0,
+    }
+
+
+def print_report(report: Dict):
+    print(f"{'Стратегия':<10} {'Эло':>7} {'Партии':>7} {'Победы':>7} {'Пораж.':>7} {'Ничьи':>7} {'% побед':>8}")
+    for name, rating in sorted(report["elo"].items(), key=lambda item: -item[1]):
+        row = report["stats"][name]
+        win_rate = row["wins"] / row["games"] if row["games"] else 0.0
+        print(f"{name:<10} {rating:>7.0f} {row['games']:>7} {row['wins']:>7} {row['losses']:>7} "
+              f"{row['draws']:>7} {win_rate:>8.1%}")
+    print(f"Сыграно партий: {report['games']}, {report['games_per_sec']:.1f} партий/с")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Турнир ботов по кругу")
+    parser.add_argument("--policies", nargs="+", default=["greedy", "random", "mcts"], choices=sorted(POLICIES))
+    parser.add_argument("--games", type=int, default=200, help="партий на каждую пару стратегий")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--mcts-budget", type=float, default=0.02, help="секунд на ход MCTS-бота")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_tournament(args.policies, args.games, args.workers,
+                            {"mcts_budget": args.mcts_budget}, args.seed)
+    print_report(report)